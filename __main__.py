@@ -1,62 +1,85 @@
-import os
 import time
-from scripts import validateSchema  # your custom modules
-import statistics, warnings, math, asyncio
-import re, math
+STARTUP_BEGAN = time.perf_counter() # Time-to-first-frame is measured from here
+import os
+# Only what the first frame needs is imported up front. Network, image, schema and push
+# features import their dependencies when a layout or flag first uses them.
+from scripts import spriteCache, templates, dataScheduler, dirtyRegions, fontAtlas, renderNodes, frameStats, frameScheduler, profiler, presenter, workerPool, prefetch, layoutReload, layoutCache, playlist, lazy  # your custom modules
+import asyncio
 import scripts.api
-from scripts.api import getTime, getNews, getTeams # regex
-from collections import deque
+from scripts.api import getTime, getTeams
 from datetime import datetime
-from PIL import Image, ImageDraw
 
-NewsParser = scripts.api.getNews.NewsParser()
-TeamsParser = scripts.api.getTeams.TeamsParser()
+aiohttp = lazy.lazy_import("aiohttp")
+getNews = lazy.lazy_import("scripts.api.getNews")
+
+def make_news_parser():
+    parser = getNews.NewsParser()
+    # Start with the headlines saved by the last run; update() fetches fresh ones in the background
+    loaded = parser.load_snapshot()
+    if loaded:
+        print(f"Loaded {loaded} headlines from the news snapshot.")
+    return parser
+
+# Built on first use, e.g. when a layout binds {NewsParser:...} or update() starts polling
+NewsParser = lazy.Deferred(make_news_parser)
+TeamsParser = lazy.Deferred(getTeams.TeamsParser)
+Scheduler = dataScheduler.DataScheduler()
+
+# Named sources for the layout 'dataSource' field; dataParams are passed as keyword arguments.
+# Looked up when a layout uses one, so naming a source does not build its parser.
+DATA_SOURCES = {
+    "time": lambda: getTime.get_time,
+    "news": lambda: NewsParser.get_current_news_str,
+    "teams": lambda: TeamsParser.get_current_teams_str,
+}
 
 # --- Platform detection ---
 def is_raspberry_pi():
+    # The device-tree model is one short line; /proc/cpuinfo is only scanned without it
+    try:
+        with open("/proc/device-tree/model", "r") as f:
+            return "Raspberry Pi" in f.read()
+    except OSError:
+        pass
     try:
         with open("/proc/cpuinfo", "r") as f:
-            cpuinfo = f.read()
-        return "Raspberry Pi" in cpuinfo or "BCM" in cpuinfo
+            return any("Raspberry Pi" in line or "BCM" in line for line in f)
     except FileNotFoundError:
         return False
 
-if is_raspberry_pi():
-    from rgbmatrix import RGBMatrix, RGBMatrixOptions, graphics
-    print("Running on Pi - Using RGBMatrix library.")
-else:
-    from RGBMatrixEmulator import RGBMatrix, RGBMatrixOptions, graphics
-    print("Running on non-Pi system: Emulating RGBMatrix library.")
+ON_PI = is_raspberry_pi()
+RGBMatrix = RGBMatrixOptions = graphics = None # Bound by load_matrix_library()
+DEBUG_COLOURS = []
+
+def load_matrix_library():
+    """Imports the matrix library (the emulator off the Pi) the first time something draws."""
+    global RGBMatrix, RGBMatrixOptions, graphics, DEBUG_COLOURS
+    if graphics is not None:
+        return
+    if ON_PI:
+        from rgbmatrix import RGBMatrix, RGBMatrixOptions, graphics
+        print("Running on Pi - Using RGBMatrix library.")
+    else:
+        from RGBMatrixEmulator import RGBMatrix, RGBMatrixOptions, graphics
+        print("Running on non-Pi system: Emulating RGBMatrix library.")
+
+    # --- Debug colours ---
+    DEBUG_COLOURS = [
+        graphics.Color(255, 0, 0), graphics.Color(0, 255, 0), graphics.Color(0, 0, 255),
+        graphics.Color(255, 255, 0), graphics.Color(255, 0, 255), graphics.Color(0, 255, 255),
+        graphics.Color(255, 128, 0), graphics.Color(128, 0, 255)
+    ]
 
 # --- Fonts directory ---
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 FONTS_DIR = os.path.join(PROJECT_ROOT, "fonts")
 
-# --- Debug colours ---
-DEBUG_COLOURS = [
-    graphics.Color(255, 0, 0), graphics.Color(0, 255, 0), graphics.Color(0, 0, 255),
-    graphics.Color(255, 255, 0), graphics.Color(255, 0, 255), graphics.Color(0, 255, 255),
-    graphics.Color(255, 128, 0), graphics.Color(128, 0, 255)
-]
-
-# --- ClippedCanvas helper ---
-class ClippedCanvas:
-    def __init__(self, real_canvas, offset_x, offset_y, width, height):
-        self._canvas = real_canvas
-        self.offset_x, self.offset_y = offset_x, offset_y
-        self.width, self.height = width, height
-
-    def SetPixel(self, x, y, r, g, b):
-        if 0 <= x < self.width and 0 <= y < self.height:
-            self._canvas.SetPixel(self.offset_x + x, self.offset_y + y, r, g, b)
-
-    def Clear(self):
-        for lx in range(self.width):
-            for ly in range(self.height):
-                self._canvas.SetPixel(self.offset_x + lx, self.offset_y + ly, 0, 0, 0)
-
 # --- Layout unpacker ---
-async def unpack_layout(layout: dict, panel_width: int, panel_height: int):
+def flatten_layout(layout: dict, panel_width: int, panel_height: int):
+    """
+    Resolves a validated layout's geometry into a flat, zIndex-ordered list of plain objects.
+    The result is JSON-serializable, so scripts/layoutCache.py can store it.
+    """
     def parse_dimension(value: str, total: int) -> int:
         if value.endswith("%"):
             return int(float(value[:-1]) / 100 * total)
@@ -76,7 +99,7 @@ async def unpack_layout(layout: dict, panel_width: int, panel_height: int):
             y -= h
         return x, y
 
-    def recurse(objects, parent_w, parent_h, parent_x=0, parent_y=0):
+    def recurse(objects, parent_w, parent_h, parent_x=0, parent_y=0, parent_z=0):
         flat = []
         for obj in objects:
             x = parse_dimension(obj["x"], parent_w)
@@ -89,8 +112,9 @@ async def unpack_layout(layout: dict, panel_width: int, panel_height: int):
                                            obj.get("horizontal", "left"),
                                            obj.get("vertical", "top"))
 
+            z = obj.get("zIndex", parent_z)
             if obj["type"] == "Group":
-                flat.extend(recurse(obj["objects"], w, h, abs_x, abs_y))
+                flat.extend(recurse(obj["objects"], w, h, abs_x, abs_y, z))
             else:
                 flat.append({
                     "type": obj["type"], "x": abs_x, "y": abs_y,
@@ -100,213 +124,199 @@ async def unpack_layout(layout: dict, panel_width: int, panel_height: int):
                     "bgColor": obj.get("bgColor"), "scrollSpeed": obj.get("scrollSpeed"),
                     "dataSource": obj.get("dataSource"), "dataParams": obj.get("dataParams"),
                     "onScrollEnd": obj.get("onScrollEnd"),
-                    "text_align": obj.get("text_align", "left")
+                    "text_align": obj.get("text_align", "left"),
+                    "zIndex": z
                 })
         return flat
 
-    return recurse(layout["objects"], panel_width, panel_height)
+    # Objects are drawn (and composited) in list order, so stack them by zIndex; ties keep layout order
+    return sorted(recurse(layout["objects"], panel_width, panel_height), key=lambda obj: obj["zIndex"])
+
+async def bind_layout(flat, resources=None):
+    """Attaches the live parts to flattened objects: compiled templates and decoded images."""
+    def compile_text(obj):
+        # Placeholders are bound once here and handed to the Scheduler; draw_layout only
+        # joins the values it has published.
+        source = obj.get("dataSource")
+        if source:
+            if source not in DATA_SOURCES:
+                raise ValueError(f"Unknown dataSource: {source}")
+            return templates.source_template(Scheduler, source, DATA_SOURCES[source](), obj.get("dataParams"))
+        return templates.compile_template(obj.get("text", ""), globals(), Scheduler)
+
+    async def load_image(obj):
+        # Fetched, decoded and fitted to the box here, so drawing an image is only a blit
+        try:
+            obj["image"] = await _IMAGE_CACHE.load(obj["path"], obj["width"], obj["height"])
+        except (OSError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"\nImage {obj['path']} not loaded: {e}")
+
+    await map_fonts(flat)
+    for obj in flat:
+        obj["template"] = compile_text(obj)
+        obj["on_scroll_end"] = templates.compile_template(obj.get("onScrollEnd"), globals())
+    await asyncio.gather(*(load_image(obj) for obj in flat if obj["type"] == "Image" and obj["path"]))
+    if resources:
+        # Declared resources are only fetched into the disk cache, in the background
+        asyncio.create_task(prefetch_resources(list(resources.values())))
+    return flat
+
+async def prefetch_resources(paths):
+    await FIRST_FRAME.wait() # Not worth delaying the first frame for
+    await _IMAGE_CACHE.prefetch(paths)
 
-# --- Check API Calls ---
-async def checkAPICalls(inputText, returnText = True):
-
-    api_list = re.findall(r'\{(.*?)\}', inputText)
-    replace_list = []
-    outputText = inputText
-
-    if len(api_list) == 0:
-        return inputText # No API calls, so display the text as-is
-
-    for item in api_list:
-        vars = item.split(':')
-        
-        api_module = globals()[vars[0]]
-        func_to_call = getattr(api_module, vars[1])
-        if len(vars) > 2:
-            argument = vars[2]
-            replacementText = func_to_call(argument)
-        else:
-            replacementText = func_to_call()
+async def unpack_layout(layout: dict, panel_width: int, panel_height: int):
+    return await bind_layout(flatten_layout(layout, panel_width, panel_height), layout.get("resources"))
 
-        if returnText:
-            outputText = outputText.replace("{" + item + "}", replacementText)
+# --- Drawing logic ---
 
-    if not returnText:
-        return
-    
-    return outputText
+def font_path(font_name):
+    return font_name if font_name.startswith('/') else f'./fonts/{font_name}'
 
-def draw_colour_text(canvas, font, x, y, default_color, text):
+async def map_fonts(flat):
     """
-    Replacement for draw_colour_text that supports inline [fg:#RRGGBB] and [bg:#RRGGBB] tags.
-    Returns the total visual width of the rendered text.
+    Maps every font the objects use into _FONT_CACHE. A font whose atlas is missing or stale
+    is compiled from its BDF on a worker thread, so building their nodes never parses a BDF
+    on the loop; concurrent loads of one font share a single compile.
     """
-    # 1. Setup Parser Logic
-    pattern = r'(\[(?:fg|bg):(?:#[0-9a-fA-F]{6}|none)\])'
-    parts = re.split(pattern, text)
-    
-    def hex_to_col(hex_str):
-        if not hex_str or hex_str == "none": return default_color
-        return graphics.Color(int(hex_str[1:3], 16), int(hex_str[3:5], 16), int(hex_str[5:7], 16))
-
-    current_x = x
-    curr_fg = default_color
-    curr_bg = None
-    total_visual_width = 0
-
-    for part in parts:
-        if not part:
-            continue
-            
-        # Check if part is a tag
-        tag_match = re.match(r'\[(fg|bg):(.*)\]', part)
-        if tag_match:
-            tag_type, val = tag_match.groups()
-            if tag_type == "fg":
-                curr_fg = hex_to_col(val)
-            elif tag_type == "bg":
-                curr_bg = hex_to_col(val)
-            # Note: bg support depends on your specific matrix implementation 
-            # standard rpi-rgb-led-matrix DrawText only supports fg color.
+    for font_name in {renderNodes.font_of(obj) for obj in flat} - {None}:
+        if font_name in _FONT_CACHE:
             continue
-        
-        # It's actual text
-        # draw_colour_text returns the width of the text drawn
-
-        # draw the bg colour behind the text
-
-        if curr_bg:
-            bg_width = graphics.DrawText(canvas, font, int(current_x), int(y), curr_fg, part) + 2
-            bg_height = font.height + 2
-
-            for bg_y in range(bg_height):
-                graphics.DrawLine(canvas, int(current_x - 1), int(y - bg_y + 1), int(current_x + bg_width), int(y - bg_y + 1), curr_bg)
-
-        width = graphics.DrawText(canvas, font, int(current_x), int(y), curr_fg, part)
-
-        current_x += width
-        total_visual_width += width
-
-    return total_visual_width
-
-# --- Drawing logic ---
-
-async def draw_layout(matrix, canvas, objects, fonts_cache=None, scroll_state=None, debug=False, dt=0):
-    global _COLOR_CACHE
-    if fonts_cache is None: fonts_cache = {}
+        load = _FONT_LOADS.get(font_name)
+        if load is None:
+            load = _FONT_LOADS[font_name] = asyncio.ensure_future(
+                asyncio.to_thread(fontAtlas.load_atlas, font_path(font_name)))
+        try:
+            _FONT_CACHE[font_name] = await load
+        finally:
+            _FONT_LOADS.pop(font_name, None)
+
+def load_font(font_name, fonts_cache):
+    """Returns the memory-mapped glyph atlas for a font; map_fonts has compiled it if it was stale."""
+    font = fonts_cache.get(font_name)
+    if not font:
+        font = fonts_cache[font_name] = fontAtlas.load_atlas(font_path(font_name), compile_stale=False)
+    return font
+
+def parse_color(hex_str):
+    """Cached '#RRGGBB' -> graphics.Color; an 8-digit colour's alpha is read by the render node."""
+    color = _COLOR_CACHE.get(hex_str)
+    if color is None:
+        r, g, b = int(hex_str[1:3], 16), int(hex_str[3:5], 16), int(hex_str[5:7], 16)
+        color = _COLOR_CACHE[hex_str] = graphics.Color(r, g, b)
+    return color
+
+def compile_layout(objects, fonts_cache):
+    """Compiles unpack_layout output into render nodes, mapping every font it needs up front."""
+    return renderNodes.compile_nodes(objects, lambda name: load_font(name, fonts_cache), parse_color)
+
+def compile_object(index, obj, fonts_cache):
+    """Compiles a single flat object (layout hot-reload rebuilds only the ones that changed)."""
+    return renderNodes.compile_node(index, obj, lambda name: load_font(name, fonts_cache), parse_color)
+
+def warm_node(node):
+    """Resolves and rasterizes a freshly compiled node's text, so its first frame costs no more than any other."""
+    if isinstance(node, renderNodes.TextNode):
+        node.update_text(_SPRITE_CACHE)
+        if RENDER_BACKEND == "numpy":
+            node.sprite.arrays()
+    return node
+
+async def compile_alert(alert, alert_id, panel_width, panel_height, fonts_cache):
+    """
+    Builds the overlay node for a pushed alert. Its text is shown as sent: placeholders and
+    data sources are not bound. The font is compiled and the text rasterized on worker
+    threads, so a push never holds the draw loop.
+    """
+    obj = dict(alert, text=None, dataSource=None, onScrollEnd=None)
+    flat = await unpack_layout({"objects": [obj]}, panel_width, panel_height)
+    flat[0]["template"] = templates.literal_template(alert["text"])
+    node = compile_object(f"alert:{alert_id}", flat[0], fonts_cache)
+    if isinstance(node, renderNodes.TextNode):
+        text = node.template.resolve()
+        node.prepared = {text: await node.prepare_async(text, _SPRITE_CACHE)}
+        if RENDER_BACKEND == "numpy":
+            await asyncio.to_thread(node.prepared[text][0].arrays)
+    return warm_node(node)
+
+async def draw_layout(matrix, canvas, nodes, fonts_cache=None, scroll_state=None, debug=False, dt=0, regions=None, now=None):
+    """
+    Renders nodes from compile_layout; each node's render function was picked at compile time.
+    `now` is the frame's monotonic time (scrolling is positioned from it), `dt` the real interval since the last frame.
+    """
     if scroll_state is None: scroll_state = {}
+    if now is None: now = time.perf_counter()
 
-    for idx, obj in enumerate(objects):
-        obj_type = obj.get("type")
-        if obj_type not in ("Textbox", "ScrollingTextbox", "Alert"):
-            continue
-
-        # 1. OPTIMIZED: Pre-parsed font lookup
-        font_name = obj.get("font", "4x6.bdf")
-        # Optimization: Use a simple key; do path logic once outside this loop
-        font = fonts_cache.get(font_name) 
-        if not font:
-            font_path = font_name if font_name.startswith('/') else f'./fonts/{font_name}'
-            f = graphics.Font()
-            f.LoadFont(font_path)
-            fonts_cache[font_name] = f
-            font = f
-
-        # 2. OPTIMIZED: Cached Color Parsing
-        fg_hex = obj.get("fgColor", "#FFFFFF")
-        if fg_hex not in _COLOR_CACHE:
-            r, g, b = int(fg_hex[1:3], 16), int(fg_hex[3:5], 16), int(fg_hex[5:7], 16)
-            _COLOR_CACHE[fg_hex] = graphics.Color(r, g, b)
-        color = _COLOR_CACHE[fg_hex]
-
-        # 3. CRITICAL: Throttled API Calls
-        # Only call checkAPICalls if the text has placeholders like {api_val}
-        # Ideally, move this out of the render loop to a background task
-        raw_text = obj.get("text", "")
-        text = await checkAPICalls(raw_text) if "{" in raw_text else raw_text
-
-        # 4. Dimensions and Baseline
-        x0, y0, w, h = obj["x"], obj["y"], obj["width"], obj["height"]
-        # CharacterWidth is expensive; for static text, cache this in the 'obj'
-        if "cached_width" not in obj or obj.get("_last_text") != text:
-            obj["cached_width"] = sum(font.CharacterWidth(ord(c)) for c in text)
-            obj["_last_text"] = text
-        
-        text_width = obj["cached_width"]
-        y_baseline = y0 + ((h + font.height) // 2 - 1)
-
-        if obj_type == "ScrollingTextbox":
-            if idx not in scroll_state:
-                scroll_state[idx] = w
-                # Only trigger onScrollEnd once, not every frame
-            
-            pos_local = scroll_state[idx]
-            draw_colour_text(canvas, font, int(x0 + pos_local), y_baseline, color, text)
-            
-            # Use dt to ensure smooth scrolling regardless of frame rate
-            scroll_state[idx] -= (30 * dt)
-            if (pos_local + text_width) < 0:
-                scroll_state[idx] = w
-                onScrollEnd = obj.get("onScrollEnd")
-                if onScrollEnd: await checkAPICalls(onScrollEnd, False)
-
-        else:
-            # Static Text alignment
-            align = obj.get("text_align", "left")
-            x_off = 0
-            if align == "center": x_off = (w - text_width) // 2
-            elif align == "right": x_off = w - text_width
-
-            draw_colour_text(canvas, font, x0 + x_off, y_baseline, color, text)
+    ctx = renderNodes.RenderContext(canvas, regions, _SPRITE_CACHE, scroll_state, now, dt)
+    if PROFILER is not None:
+        PROFILER.instrument_context(ctx)
+    for node in nodes:
+        node.render(node, ctx)
 
-        # 5. Debug Boxes (Keep simple)
+        # Debug Boxes (Keep simple)
         if debug:
-            draw_debug_rect(canvas, x0, y0, w, h, idx)
+            draw_debug_rect(canvas, node.x, node.y, node.width, node.height, node.index)
 
     return canvas, scroll_state, fonts_cache
 
-async def draw_sun_gradient(matrix, canvas):
+async def draw_sun_gradient(matrix, canvas, regions=None):
     now = datetime.now()
     day_ratio = (now.hour * 3600 + now.minute * 60 + now.second) / 86400.0
 
+    width = matrix.width
+
+    # Position Calculation
+    start_time, end_time = 0.25, 0.875
+    progress = (day_ratio - start_time) / (end_time - start_time)
+    sun_x = int(width * progress)
+
+    if regions is not None:
+        # Only repainted when the sun moves a column (rows 0-2 hold the gradient and sun)
+        regions.layer("sun", sun_x, (0, 0, width, 3), paint_sun_gradient, width, sun_x)
+        return canvas
+
+    paint_sun_gradient(canvas, width, sun_x)
+    return canvas
+
+def paint_sun_gradient(canvas, width, sun_x):
     # 1. Setup Constants
     night_col = (15, 15, 60)
     day_yellow = (255, 255, 0)
     sunset_pink = (255, 20, 147)
     
-    width = matrix.width
     half_width = width / 2
     glow_radius = width * 0.3
-    
-    # 2. Position Calculation
-    start_time, end_time = 0.25, 0.875
-    progress = (day_ratio - start_time) / (end_time - start_time)
-    sun_x = int(width * progress)
 
-    # 3. DRAW GRADIENT (One pass across width)
-    for x in range(width):
-        dx = abs(x - sun_x)
-        if dx > half_width:
-            dx = width - dx
+    # 2. DRAW GRADIENT (One pass across width)
+    gradient_row = getattr(canvas, "gradient_row", None)
+    if gradient_row is not None:
+        # NumPy framebuffer: same maths, computed for the whole row at once
+        gradient_row(0, sun_x, glow_radius, day_yellow, sunset_pink, night_col)
+    else:
+        for x in range(width):
+            dx = abs(x - sun_x)
+            if dx > half_width:
+                dx = width - dx
             
-        dist = min(1.0, dx / glow_radius)
-
-        if dist < 0.3:
-            r, g, b = day_yellow
-        elif dist < 0.7:
-            t = (dist - 0.3) / 0.4
-            r = int(day_yellow[0] + t * (sunset_pink[0] - day_yellow[0]))
-            g = int(day_yellow[1] + t * (sunset_pink[1] - day_yellow[1]))
-            b = int(day_yellow[2] + t * (sunset_pink[2] - day_yellow[2]))
-        else:
-            t = (dist - 0.7) / 0.3
-            r = int(sunset_pink[0] + t * (night_col[0] - sunset_pink[0]))
-            g = int(sunset_pink[1] + t * (night_col[1] - sunset_pink[1]))
-            b = int(sunset_pink[2] + t * (night_col[2] - sunset_pink[2]))
+            dist = min(1.0, dx / glow_radius)
+
+            if dist < 0.3:
+                r, g, b = day_yellow
+            elif dist < 0.7:
+                t = (dist - 0.3) / 0.4
+                r = int(day_yellow[0] + t * (sunset_pink[0] - day_yellow[0]))
+                g = int(day_yellow[1] + t * (sunset_pink[1] - day_yellow[1]))
+                b = int(day_yellow[2] + t * (sunset_pink[2] - day_yellow[2]))
+            else:
+                t = (dist - 0.7) / 0.3
+                r = int(sunset_pink[0] + t * (night_col[0] - sunset_pink[0]))
+                g = int(sunset_pink[1] + t * (night_col[1] - sunset_pink[1]))
+                b = int(sunset_pink[2] + t * (night_col[2] - sunset_pink[2]))
         
-        # Set the vertical column (assuming height is small, otherwise loop y)
-        canvas.SetPixel(x, 0, r, g, b)
+            # Set the vertical column (assuming height is small, otherwise loop y)
+            canvas.SetPixel(x, 0, r, g, b)
 
-    # 4. DRAW SUN (Once, on top of gradient)
+    # 3. DRAW SUN (Once, on top of gradient)
     # Using a fixed coordinate mask for a radius 2 circle to avoid sqrt math
     sun_mask = [
         (0, -2), 
@@ -319,22 +329,49 @@ async def draw_sun_gradient(matrix, canvas):
     for ox, oy in sun_mask:
         # modulo width handles the wrap-around for the sun body itself
         canvas.SetPixel((sun_x + ox) % width, oy, 255, 255, 0)
-        
-    return canvas
+
+def make_image_cache():
+    from scripts import imageCache
+    return imageCache.ImageCache(max_bytes=16 * 1024 * 1024) # Decoded images (and GIF frames), past 16 MiB
 
 # Misc. Variables
+RENDER_BACKEND = "canvas" # "canvas" draws straight onto the matrix canvas; "numpy" composes into a FrameBuffer
 TARGET_FPS = 100
-TARGET_FRAME_TIME = 1.0 / (TARGET_FPS*1.1)
-ACTUAL_FRAME_TIMES = deque(maxlen=10000)
+MIN_FPS = 20 # Under sustained overload the frame scheduler backs off, but not below this
+TARGET_FRAME_TIME = 1.0 / TARGET_FPS # Deadlines are absolute, so no allowance for sleep overhead is needed
+# Swap on vsync from a presenter thread instead of blocking the event loop. Only on the Pi by
+# default: the emulator's pygame window can only be flipped from the thread that created it.
+PRESENT_THREAD = ON_PI
+LAYOUT_PATH = "./layouts/1.json"
+PLAYLIST_PATH = None # Rotate through the scenes of a playlist file instead of one layout (--playlist)
+WATCH_LAYOUT = False # Reload the layout when its file changes (--watch)
+ALERT_LISTEN = None # TCP port or Unix socket path to accept pushed alerts on (--alerts)
+TEAMS_LISTEN = None # TCP port or Unix socket path Teams messages are posted to (--teams)
+TEAMS_SECRET = None # Outgoing-webhook security token; requests must be signed with it when set
+PROFILER = None # A profiler.Profiler when run with --profile
+PROFILE_COLLAPSED_PATH = None # Optional folded-stack output for flamegraph tools
+STATS_INTERVAL = 1.0 # Seconds between FPS readouts / stats file updates
+STATS_PATH = frameStats.DEFAULT_STATS_PATH # Read with: python -m scripts.frameStats
 ACTUAL_FPS = 0
 _COLOR_CACHE = {}
+_FONT_CACHE = {} # Font name -> mapped GlyphAtlas, shared by every scene and alert
+_FONT_LOADS = {} # Font name -> atlas load in progress on a worker thread
+_SPRITE_CACHE = spriteCache.SpriteCache(max_bytes=4 * 1024 * 1024) # Rasterized text, LRU-evicted past 4 MiB
+_IMAGE_CACHE = lazy.Deferred(make_image_cache) # Built when a layout first shows an Image
+FIRST_FRAME = asyncio.Event() # Set once the first frame is on the panel; non-essential startup waits for it
+STARTUP_TARGET = 1.0 # Seconds; time-to-first-frame above this is flagged in the startup report
+STARTUP_TIMES = {} # Stage -> ms since STARTUP_BEGAN, reported in the stats file as "startup"
+
+def mark_startup(stage):
+    STARTUP_TIMES[stage] = (time.perf_counter() - STARTUP_BEGAN) * 1000
 
 async def draw():
-    global ACTUAL_FRAME_TIMES, ACTUAL_FPS, _COLOR_CACHE
+    global ACTUAL_FPS, _COLOR_CACHE
 
     # Init variables required for draw
 
     # --- Main setup ---
+    load_matrix_library()
     options = RGBMatrixOptions()
     options.rows = 32
     options.cols = 64
@@ -344,75 +381,243 @@ async def draw():
     options.gpio_slowdown = 4
 
     matrix = RGBMatrix(options=options)
-    canvas = matrix.CreateFrameCanvas()
-
-    layout = validateSchema.validate_layout("./layouts/1.json")
-    objects = await unpack_layout(layout, panel_width=options.cols * options.chain_length,
-                            panel_height=options.rows)
+    mark_startup("matrix_ms")
+
+    # SwapOnVSync blocks until the panel refreshes; the (daemon) presenter thread waits on it
+    # instead, while the loop draws the next frame into a spare canvas from its pool.
+    if PRESENT_THREAD:
+        frame_presenter = presenter.Presenter(matrix, TARGET_FRAME_TIME).start()
+        canvas = frame_presenter.acquire()
+        swap = frame_presenter.swap
+    else:
+        frame_presenter = None
+        canvas = matrix.CreateFrameCanvas()
+        swap = matrix.SwapOnVSync
+
+    # Optional NumPy backend: draw into an in-memory frame, then push it to the canvas in one go
+    # With a persistent frame, only layers that changed since the last frame are repainted.
+    frame = None
+    regions = None
+    if RENDER_BACKEND == "numpy":
+        from scripts.frameBuffer import FrameBuffer
+        frame = FrameBuffer(matrix.width, matrix.height)
+        regions = dirtyRegions.DirtyRegions(frame.width, frame.height)
+
+    # Every font a scene uses is mapped when it is loaded, so no frame ever waits on a font load
+    fonts_cache = _FONT_CACHE
+
+    # Unchanged layout files skip schema validation and geometry, keyed by their content hash
+    panel_width, panel_height = options.cols * options.chain_length, options.rows
+    layouts_cache = layoutCache.LayoutCache(panel_width, panel_height)
+
+    def make_reloader(path):
+        return layoutReload.LayoutReloader(
+            path,
+            lambda layout: flatten_layout(layout, panel_width, panel_height),
+            bind_layout,
+            lambda idx, obj: warm_node(compile_object(idx, obj, fonts_cache)),
+            cache=layouts_cache
+        )
 
-    fonts_cache = {}
-    scroll_state = {}
+    # A single layout is a playlist of one scene that never ends. Upcoming scenes (and, with
+    # --watch, edited ones) are built in the background, then swapped in between frames.
+    entries = playlist.load_playlist(PLAYLIST_PATH) if PLAYLIST_PATH else [(LAYOUT_PATH, float("inf"), None)]
+    scenes = playlist.Playlist(entries, make_reloader, watch=WATCH_LAYOUT)
+    scene = await scenes.start()
+    nodes, scroll_state = scene.nodes, scene.scroll_state
+    scenes_task = watch_task(asyncio.create_task(scenes.run()), "Playlist maintenance")
+    mark_startup("layout_ms")
+
+    # Rasterizes and measures the next few headlines ahead of time, so onScrollEnd swaps are free.
+    # Only started once a scene binds the news source, which is what builds NewsParser.
+    prefetcher = prefetch_task = None
+    def prefetch_headlines(nodes):
+        nonlocal prefetcher, prefetch_task
+        if prefetcher is not None:
+            prefetcher.set_nodes(nodes)
+        elif lazy.is_built(NewsParser):
+            prefetcher = prefetch.LookaheadPrefetcher(nodes, Scheduler, NewsParser.get_current_news_str,
+                                                      NewsParser.lookahead, _SPRITE_CACHE)
+            prefetch_task = asyncio.create_task(prefetcher.run())
+    prefetch_headlines(nodes)
+
+    # The push endpoints (and aiohttp with them) are only brought up once the first frame is shown
+    alerts = teams = None
+    async def start_endpoints():
+        nonlocal alerts, teams
+        await FIRST_FRAME.wait()
+
+        # Pushed alerts are compiled as they arrive, then drawn over the scene from the next frame on
+        if ALERT_LISTEN:
+            from scripts import alertServer
+            server = alertServer.AlertServer(
+                lambda alert, alert_id: compile_alert(alert, alert_id, panel_width, panel_height, fonts_cache),
+                port=None if "/" in ALERT_LISTEN else int(ALERT_LISTEN),
+                socket_path=ALERT_LISTEN if "/" in ALERT_LISTEN else None,
+                trigger_scene=scenes.trigger
+            )
+            alerts = await server.start()
+
+        # Teams messages are pushed in (no polling); each is formatted as it arrives
+        if TEAMS_LISTEN:
+            from scripts import teamsWebhook
+            teams = await teamsWebhook.TeamsWebhook(
+                TeamsParser,
+                port=None if "/" in TEAMS_LISTEN else int(TEAMS_LISTEN),
+                socket_path=TEAMS_LISTEN if "/" in TEAMS_LISTEN else None,
+                secret=TEAMS_SECRET
+            ).start()
+    endpoints_task = asyncio.create_task(start_endpoints())
+    layers = nodes
+
+    # Profiling wraps the frame stages once here, so an unprofiled loop calls the originals directly
+    if PROFILER is not None:
+        PROFILER.instrument(nodes)
+        swap = PROFILER.timed("swap", swap, scope=profiler.FRAME_SCOPE, counts_frame=True)
+        if frame is not None:
+            regions.end_frame = PROFILER.timed("composite", regions.end_frame, scope=profiler.FRAME_SCOPE)
+            frame.present = PROFILER.timed("present", frame.present, scope=profiler.FRAME_SCOPE)
+
+    stats = frameStats.FrameStats(TARGET_FRAME_TIME, report_interval=STATS_INTERVAL, stats_path=STATS_PATH)
+    # Paces frames on absolute deadlines and lowers the rate if drawing can't keep up
+    def retarget(frame_time):
+        stats.set_target(frame_time)
+        if frame_presenter is not None:
+            frame_presenter.set_frame_time(frame_time)
+    pacer = frameScheduler.FrameScheduler(TARGET_FPS, MIN_FPS, on_retarget=retarget)
 
     # The main draw loop
 
-    frame_end_time = time.perf_counter()
-
     while True:
-        frame_start_time = time.perf_counter()
-        
-        # 1. Precise Delta Time
-        dt = frame_start_time - frame_end_time
-        
-        # 2. Safe Performance Metrics (Avoids StatisticsError on empty list)
-        if len(ACTUAL_FRAME_TIMES) > (TARGET_FPS / 5):
-            # fmean is faster than mean for floating point data
-            # current_fps uses the last 10 frames for responsiveness
-            current_fps = 1 / statistics.fmean(list(ACTUAL_FRAME_TIMES)[-10:])
-            avg_fps = 1 / statistics.fmean(ACTUAL_FRAME_TIMES)
-            print(f"Current FPS: {current_fps:3.0f} | Average FPS: {avg_fps:5.1f}", end='\r', flush=True)
+        # 1. Frame time and the real interval since the previous frame
+        frame_start_time, dt = pacer.begin()
+        # A push endpoint that could not start (e.g. its port is taken) ends the ticker with its error
+        if endpoints_task is not None and endpoints_task.done():
+            endpoints_task.result()
+            endpoints_task = None
+        if FIRST_FRAME.is_set():
+            stats.record(dt)
+
+        # 2. Performance Metrics: recording is O(1), percentiles are only worked out once per report
+        if stats.due():
+            extra = {"sprites": _SPRITE_CACHE.stats(), "layouts": layouts_cache.stats(), "startup": STARTUP_TIMES}
+            if lazy.is_built(_IMAGE_CACHE):
+                extra["images"] = _IMAGE_CACHE.stats()
+            if regions is not None:
+                extra["repaint"] = regions.stats()
+            if frame_presenter is not None:
+                extra["presenter"] = frame_presenter.stats()
+            if PLAYLIST_PATH:
+                extra["playlist"] = scenes.stats()
+            if alerts is not None:
+                extra["alerts"] = alerts.stats()
+            if teams is not None:
+                extra["teams"] = teams.stats()
+            extra["pacing"] = pacer.stats()
+            snapshot = stats.report(extra)
+            ACTUAL_FPS = snapshot["current_fps"]
+            interval = snapshot["interval"]
+            repainted = f" | Repainted: {regions.last_pixels:6d} px" if regions is not None else ""
+            missed = f" | Missed vsyncs: {frame_presenter.missed_vsyncs}" if frame_presenter is not None else ""
+            print(f"Current FPS: {snapshot['current_fps']:3.0f}/{pacer.fps:3.0f} | Average FPS: {snapshot['average_fps']:5.1f} | "
+                  f"p50/p95/p99: {interval['p50_ms']:4.1f}/{interval['p95_ms']:4.1f}/{interval['p99_ms']:4.1f} ms | "
+                  f"Dropped: {snapshot['dropped']}{missed} | Sprite hits: {_SPRITE_CACHE.hit_rate:6.1%}{repainted}", end='\r', flush=True)
 
         # 3. Application Logic (Preserved)
 
-        canvas.Clear() # Clear the canvas before any of our drawing functions.
+        layers_changed = False
+        if scenes.tick():
+            nodes, scroll_state = scenes.current.nodes, scenes.current.scroll_state
+            prefetch_headlines(nodes)
+            layers_changed = True
+            if regions is not None:
+                regions.invalidate()
+        if alerts is not None and alerts.take(frame_start_time):
+            layers_changed = True
+        if layers_changed:
+            # Alerts go last, so they are drawn over whatever the scene shows
+            layers = nodes + alerts.nodes if alerts is not None else nodes
+            if PROFILER is not None:
+                PROFILER.instrument(layers)
+
+        target = frame if frame is not None else canvas
+
+        if regions is not None:
+            regions.begin_frame()
+        else:
+            target.Clear() # Clear the canvas before any of our drawing functions.
 
-        canvas = await draw_sun_gradient(matrix, canvas)
+        target = await draw_sun_gradient(matrix, target, regions)
 
-        canvas, scroll_state, fonts_cache = await draw_layout(
+        target, scroll_state, fonts_cache = await draw_layout(
             matrix, 
-            canvas, 
-            objects, 
+            target, 
+            layers, 
             fonts_cache=fonts_cache, 
             scroll_state=scroll_state, 
-            dt=TARGET_FRAME_TIME
+            dt=dt,
+            regions=regions,
+            now=frame_start_time
         )
 
-        matrix.SwapOnVSync(canvas)
-
-        
-        # 4. Frame Rate Limiting
-        frame_end_time = time.perf_counter()
-        render_duration = frame_end_time - frame_start_time
-        sleep_time = TARGET_FRAME_TIME - render_duration
-        
-        if sleep_time > 0:
-            # Relinquishes control to the event loop
-            await asyncio.sleep(sleep_time)
-        
-        # 5. Record final cycle time (including sleep) for accurate FPS tracking
-        ACTUAL_FRAME_TIMES.append(time.perf_counter() - frame_start_time)
+        if frame is not None:
+            regions.end_frame(frame)
+            frame.present(canvas)
+
+        # The frame's drawing work ends here: waiting for vsync (inline, or for a free canvas
+        # from the presenter) is not load, so it doesn't count toward backing the rate off
+        pacer.end()
+
+        # Hands the frame over for the next vsync and returns a canvas that is free to draw into
+        canvas = swap(canvas)
+        if alerts is not None and alerts.active:
+            alerts.presented(time.perf_counter())
+        if not FIRST_FRAME.is_set():
+            report_startup()
+            FIRST_FRAME.set()
+
+        # 4. Frame Rate Limiting: sleep until the next frame's deadline. Even when running
+        # behind this yields once, so pushed alerts and background updates get one pass per frame.
+        await pacer.wait()
+
+def watch_task(task, name):
+    """Reports a background task that dies, rather than letting its exception vanish with it."""
+    def done(task):
+        if not task.cancelled() and task.exception() is not None:
+            exc = task.exception()
+            print(f"\n{name} stopped: {exc!r}")
+    task.add_done_callback(done)
+    return task
+
+def report_startup():
+    mark_startup("first_frame_ms")
+    first_frame = STARTUP_TIMES["first_frame_ms"]
+    over = f" (over the {STARTUP_TARGET * 1000:.0f} ms target)" if first_frame > STARTUP_TARGET * 1000 else ""
+    print(f"First frame after {first_frame:.0f} ms{over}: imports {STARTUP_TIMES['imports_ms']:.0f} ms, "
+          f"matrix ready {STARTUP_TIMES['matrix_ms']:.0f} ms, layout ready {STARTUP_TIMES['layout_ms']:.0f} ms.")
 
 async def update():
-
-    while True:
-        await NewsParser.refresh_news_feed()
-        await asyncio.sleep(0.5)
     # Background updates that should be run seperately to the draw loop to not affect FPS.
+    # The Scheduler refreshes every layout data source on its own schedule and runs the feed jobs;
+    # the news job is cheap to run often, as each feed is only polled when its own interval is up.
+    # Teams messages need no job: they are pushed to the webhook receiver started by draw().
+    # Feed polling (and the aiohttp/feedparser imports it brings) waits for the first frame.
+
+    await FIRST_FRAME.wait()
+    Scheduler.add_job(NewsParser.refresh_news_feed, 0.5)
+    try:
+        await Scheduler.run()
+    except asyncio.CancelledError:
+        if lazy.is_built(NewsParser):
+            await NewsParser.close() # the parser's pooled HTTP session lives as long as the updates do
+        raise
 
 async def main():
 
     # Runs both update & draw funcs
 
-    await NewsParser.refresh_news_feed() # do this now so it starts with news.
+    mark_startup("imports_ms")
+    workerPool.start() # fork the feed worker before the presenter (or any other) thread exists; not waited on
 
     task_draw = asyncio.create_task(draw())
     task_update = asyncio.create_task(update())
@@ -428,8 +633,84 @@ async def main():
 
 # The entry point of the script
 if __name__ == "__main__":
+    import argparse
+
+    def listen_address(value):
+        """A push endpoint's PORT or Unix socket PATH, checked here rather than when the endpoint starts."""
+        if "/" in value:
+            if not os.path.isdir(os.path.dirname(value) or "."):
+                raise argparse.ArgumentTypeError(f"no such directory for socket path '{value}'")
+            return value
+        if not value.isdigit() or not 0 < int(value) < 65536:
+            raise argparse.ArgumentTypeError(f"'{value}' is neither a port (1-65535) nor a socket path")
+        return value
+
+    parser = argparse.ArgumentParser(description="LED matrix ticker")
+    parser.add_argument("--backend", choices=("canvas", "numpy"), default=RENDER_BACKEND,
+                        help="Rendering backend; 'numpy' composes each frame in a NumPy buffer")
+    parser.add_argument("--fps", type=float, default=TARGET_FPS,
+                        help="Target frame rate; lowered automatically (down to --min-fps) under sustained overload")
+    parser.add_argument("--min-fps", type=float, default=MIN_FPS,
+                        help="Lowest frame rate the scheduler backs off to")
+    parser.add_argument("--stats-interval", type=float, default=STATS_INTERVAL,
+                        help="Seconds between FPS readouts and stats file updates")
+    parser.add_argument("--stats-file", default=STATS_PATH,
+                        help="Where to publish the latest frame stats as JSON ('' to disable)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Time every render stage per layout object and print a ranked report on exit")
+    parser.add_argument("--profile-collapsed", metavar="PATH",
+                        help="With --profile, also write folded stacks for flamegraph tools to PATH")
+    parser.add_argument("--presenter", choices=("auto", "thread", "inline"), default="auto",
+                        help="Who calls SwapOnVSync: a presenter thread, or the draw loop (auto: thread on the Pi)")
+    layout_group = parser.add_mutually_exclusive_group()
+    layout_group.add_argument("--layout", default=LAYOUT_PATH, help="Layout JSON file to display")
+    layout_group.add_argument("--playlist", metavar="PATH",
+                              help="Playlist JSON file of layouts to rotate through (see scripts/playlist.py)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Reload layouts whenever their files change, without restarting")
+    parser.add_argument("--alerts", metavar="PORT|PATH", type=listen_address,
+                        help="Accept pushed alerts over HTTP on this localhost port, or on a Unix socket path "
+                             "(see scripts/alertServer.py)")
+    parser.add_argument("--teams", metavar="PORT|PATH", type=listen_address,
+                        help="Receive Teams messages over HTTP on this localhost port, or on a Unix socket path "
+                             "(see scripts/teamsWebhook.py)")
+    parser.add_argument("--teams-secret", metavar="TOKEN",
+                        help="Base64 security token of the Teams outgoing webhook; unsigned requests are refused")
+    args = parser.parse_args()
+    RENDER_BACKEND = args.backend
+    LAYOUT_PATH = args.layout
+    PLAYLIST_PATH = args.playlist
+    WATCH_LAYOUT = args.watch
+    ALERT_LISTEN = args.alerts
+    TEAMS_LISTEN = args.teams
+    TEAMS_SECRET = args.teams_secret
+    if TEAMS_SECRET:
+        import base64, binascii
+        try:
+            base64.b64decode(TEAMS_SECRET, validate=True)
+        except binascii.Error:
+            parser.error("--teams-secret must be the base64 token Teams issued for the webhook")
+    if args.presenter != "auto":
+        PRESENT_THREAD = args.presenter == "thread"
+    TARGET_FPS = args.fps
+    MIN_FPS = args.min_fps
+    TARGET_FRAME_TIME = 1.0 / TARGET_FPS
+    STATS_INTERVAL = args.stats_interval
+    STATS_PATH = args.stats_file or None
+    if args.profile:
+        PROFILER = profiler.Profiler()
+        PROFILE_COLLAPSED_PATH = args.profile_collapsed
+        # Covers both backends: drawn directly, or repainted as the "sun" dirty-region layer
+        paint_sun_gradient = PROFILER.timed("gradient", paint_sun_gradient, scope=profiler.FRAME_SCOPE)
+
     try:
         # This starts the asyncio event loop and runs your function
         asyncio.run(main())
     except KeyboardInterrupt:
-        print("Loop terminated by user (Ctrl+C).")
\ No newline at end of file
+        print("Loop terminated by user (Ctrl+C).")
+    finally:
+        if PROFILER is not None:
+            print()
+            print(PROFILER.report())
+            if PROFILE_COLLAPSED_PATH:
+                PROFILER.write_collapsed(PROFILE_COLLAPSED_PATH)
\ No newline at end of file
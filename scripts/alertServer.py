@@ -0,0 +1,198 @@
+import itertools
+import time
+from collections import deque
+
+from aiohttp import web
+
+from scripts import validateSchema
+
+QUEUE_SIZE = 8 # Compiled alerts waiting for the next frame; pushes beyond this are refused
+MAX_ACTIVE = 4 # Alerts on screen at once; the oldest gives way
+DEFAULT_DURATION = 30.0 # Seconds an alert stays up unless the push says otherwise
+MAX_PAYLOAD_BYTES = 16 * 1024
+# Fields a push may leave out: a full-panel alert
+ALERT_DEFAULTS = {"type": "Alert", "x": "0px", "y": "0px", "width": "100%", "height": "100%",
+                  "font": "7x13.bdf", "fgColor": "#FFFFFF", "bgColor": "#C00000"}
+
+
+class Alert:
+    __slots__ = ("id", "node", "duration", "received", "expires", "presented")
+
+    def __init__(self, alert_id, node, duration, received):
+        self.id = alert_id
+        self.node = node
+        self.duration = duration
+        self.received = received
+        self.expires = None # Set when it reaches the screen
+        self.presented = False
+
+
+class AlertServer:
+    """
+    Local push interface for Alert overlays, served from the running event loop over
+    HTTP (127.0.0.1) or a Unix socket:
+
+        POST   /alerts        {"text": "...", "duration": 60, "id": "db-down", ...Alert fields}
+        DELETE /alerts/<id>   clear one alert (DELETE /alerts clears them all)
+        GET    /alerts        active alerts and push-to-pixel latency
+        POST   /scenes/<name> show the playlist scene with that trigger (with `trigger_scene`)
+
+    A push is checked against the schema's Alert fields (missing geometry, font and
+    colours default to a full-panel alert) and compiled into a render node right away by
+    `compile_alert(alert, alert_id)`, so the draw loop only has to pick it up at the next
+    frame boundary (`take`). At most QUEUE_SIZE alerts wait for a frame; further pushes
+    get 429 rather than piling work onto the loop. An alert's font is a file name in the fonts
+    directory; paths are refused. Latency runs from the request arriving to the swap of the
+    first frame showing the alert (`presented`).
+    """
+    def __init__(self, compile_alert, port=None, socket_path=None, queue_size=QUEUE_SIZE,
+                 max_active=MAX_ACTIVE, clock=time.perf_counter, trigger_scene=None):
+        self.compile_alert = compile_alert
+        self.trigger_scene = trigger_scene # playlist.Playlist.trigger, when running a playlist
+        self.port = port
+        self.socket_path = socket_path
+        self.queue_size = queue_size
+        self.max_active = max_active
+        self.clock = clock
+        self.active = []
+        self.nodes = []
+        self._pending = deque()
+        self._reserved = 0 # Queue slots held by pushes still being parsed or compiled
+        self._cleared = set()
+        self._ids = itertools.count(1)
+        self._runner = None
+
+        self.received = 0
+        self.rejected = 0
+        self.shown = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+
+    async def start(self):
+        app = web.Application(client_max_size=MAX_PAYLOAD_BYTES)
+        app.add_routes([
+            web.post("/alerts", self._post),
+            web.get("/alerts", self._get),
+            web.delete("/alerts", self._delete),
+            web.delete("/alerts/{id}", self._delete),
+            web.post("/scenes/{name}", self._trigger),
+        ])
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        if self.socket_path:
+            site = web.UnixSite(self._runner, self.socket_path)
+        else:
+            site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+        print(f"Accepting alerts on {self.socket_path or f'http://127.0.0.1:{self.port}'}/alerts")
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    # --- HTTP handlers ---
+
+    async def _post(self, request):
+        received = self.clock()
+        # The slot is taken before the first await, so concurrent pushes can't overfill the queue
+        if len(self._pending) + self._reserved >= self.queue_size:
+            self.rejected += 1
+            return web.json_response({"error": "alert queue full"}, status=429)
+        self._reserved += 1
+        try:
+            try:
+                payload = await request.json()
+                if not isinstance(payload, dict):
+                    raise ValueError("expected a JSON object")
+                duration = float(payload.pop("duration", DEFAULT_DURATION))
+                alert_id = str(payload.pop("id", "") or next(self._ids))
+                alert = validateSchema.validate_alert({**ALERT_DEFAULTS, **payload})
+            except (ValueError, TypeError, validateSchema.SchemaValidationError) as e:
+                # json.JSONDecodeError is a ValueError
+                return web.json_response({"error": str(e)}, status=400)
+            try:
+                node = await self.compile_alert(alert, alert_id)
+            except (OSError, ValueError) as e:
+                return web.json_response({"error": f"could not render alert: {e}"}, status=422)
+
+            self._cleared.discard(alert_id)
+            self._pending.append(Alert(alert_id, node, duration, received))
+            self.received += 1
+            return web.json_response({"id": alert_id}, status=202)
+        finally:
+            self._reserved -= 1
+
+    async def _trigger(self, request):
+        name = request.match_info["name"]
+        if self.trigger_scene is None or not self.trigger_scene(name):
+            return web.json_response({"error": f"no scene with trigger '{name}'"}, status=404)
+        return web.json_response({"triggered": name}, status=202)
+
+    async def _get(self, request):
+        return web.json_response({
+            "alerts": [{"id": alert.id, "text": alert.node.text} for alert in self.active],
+            **self.stats()
+        })
+
+    async def _delete(self, request):
+        alert_id = request.match_info.get("id")
+        if alert_id is None:
+            self._cleared.update(alert.id for alert in self.active)
+            self._cleared.update(alert.id for alert in self._pending)
+        else:
+            self._cleared.add(alert_id)
+        return web.json_response({"cleared": alert_id or "all"})
+
+    # --- Draw loop side ---
+
+    def take(self, now):
+        """
+        Called at each frame boundary: adds pending alerts to the overlay and drops expired
+        or cleared ones. Returns True if `nodes` (the overlay, oldest first) changed.
+        """
+        changed = False
+        while self._pending:
+            alert = self._pending.popleft()
+            if alert.id in self._cleared:
+                continue
+            # A push with the id of an alert already up replaces it
+            self.active = [a for a in self.active if a.id != alert.id]
+            self.active.append(alert)
+            changed = True
+        if len(self.active) > self.max_active:
+            self.active = self.active[-self.max_active:]
+
+        kept = [alert for alert in self.active
+                if alert.id not in self._cleared and (alert.expires is None or alert.expires > now)]
+        self._cleared.clear()
+        if changed or len(kept) != len(self.active):
+            self.active = kept
+            self.nodes = [alert.node for alert in kept]
+            return True
+        return False
+
+    def presented(self, now):
+        """Called after a frame was swapped: times alerts shown for the first time."""
+        for alert in self.active:
+            if not alert.presented:
+                alert.presented = True
+                alert.expires = now + alert.duration
+                latency = self.clock() - alert.received
+                self.shown += 1
+                self.last_latency = latency
+                self.max_latency = max(self.max_latency, latency)
+                self.total_latency += latency
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "rejected": self.rejected,
+            "queued": len(self._pending),
+            "active": len(self.active),
+            "last_latency_ms": self.last_latency * 1000,
+            "max_latency_ms": self.max_latency * 1000,
+            "avg_latency_ms": self.total_latency / self.shown * 1000 if self.shown else 0.0,
+        }
@@ -1,8 +0,0 @@
-from PIL import Image
-from PIL import ImageDraw
-import time
-from rgbmatrix import RGBMatrix, RGBMatrixOptions
-
-
-def drawImage(image):
-    pass
\ No newline at end of file
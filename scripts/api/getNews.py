@@ -1,6 +1,174 @@
-from zoneinfo import ZoneInfo
-from datetime import datetime, timedelta
-import aiohttp, feedparser, asyncio, random
+import asyncio, random, json, calendar, time, os
+from collections import OrderedDict
+from scripts import lazy
+from scripts.api import validity
+
+# Imported on first fetch/parse, so building the parser (and showing the snapshot) stays cheap
+aiohttp = lazy.lazy_import("aiohttp")
+feedparser = lazy.lazy_import("feedparser")
+
+NEWS_WINDOW_HOURS = 12 # Only headlines published within this many hours are shown
+SEEN_INDEX_SIZE = 4096 # Stories remembered across refreshes so they are not queued twice
+ITEM_FIELDS = ("title", "link", "published", "publisher", "guid", "published_ts")
+# Last good item list, so a restarted ticker has headlines from its first frame
+NEWS_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                  "cache", "news.snapshot")
+
+
+MIN_POLL_INTERVAL = 120 # Seconds; even the busiest feed is polled no more often than this
+MAX_POLL_INTERVAL = 3600
+MAX_BACKOFF = 6 * 3600 # Ceiling for a feed that keeps failing
+DEFAULT_FEEDS = [
+    "https://smartermsp.com/feed/",
+    "https://mspmastered.com/feed/",
+    "https://www.theregister.com/headlines.atom",
+    "https://stackoverflow.blog/feed/atom/",
+    "https://www.bleepingcomputer.com/feed/",
+    "https://us-cert.cisa.gov/ncas/alerts.xml",
+    "https://api.msrc.microsoft.com/update-guide/rss",
+    "http://feeds.arstechnica.com/arstechnica/index?format=xml",
+    "https://www.cloudtango.net/blog/feed/",
+    "https://www.ninjaone.com/blog/category/growth/feed/",
+    "https://feeds.bbci.co.uk/news/technology/rss.xml"
+]
+
+
+class FeedState:
+    """Per-feed conditional-request validators and polling schedule."""
+    __slots__ = ("url", "etag", "last_modified", "interval", "next_due", "failures", "last_status")
+
+    def __init__(self, url, interval):
+        self.url = url
+        self.etag = None
+        self.last_modified = None
+        self.interval = interval
+        self.next_due = 0.0
+        self.failures = 0
+        self.last_status = None
+
+    def request_headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def schedule(self, now, items=None):
+        """
+        Works out when to poll next. A failing feed backs off exponentially; otherwise the
+        interval follows the feed's own publishing rate (half the median gap between its
+        items), drifting longer while it keeps answering 304 Not Modified.
+        """
+        if self.last_status is None or self.last_status >= 400:
+            self.failures += 1
+            delay = min(MAX_BACKOFF, self.interval * 2 ** self.failures)
+        else:
+            self.failures = 0
+            published = sorted(item['published_ts'] for item in items or ())
+            if len(published) >= 2:
+                gaps = sorted(b - a for a, b in zip(published, published[1:]))
+                self.interval = min(MAX_POLL_INTERVAL, max(MIN_POLL_INTERVAL, gaps[len(gaps) // 2] / 2))
+            elif self.last_status == 304:
+                self.interval = min(MAX_POLL_INTERVAL, self.interval * 1.25)
+            delay = self.interval
+        # Jitter keeps feeds that share an interval from being polled in lockstep
+        self.next_due = now + delay * random.uniform(0.9, 1.1)
+
+
+async def fetch_feed(session, state):
+    """
+    Conditionally fetches one feed; returns (text or None, url, seconds taken). Text is None
+    for 304 Not Modified and for failures; state.last_status tells them apart (None = no response).
+    """
+    url = state.url
+    start = time.perf_counter()
+    state.last_status = None
+    try:
+        async with session.get(url, headers=state.request_headers()) as response:
+            state.last_status = response.status
+            if response.status == 200:
+                state.etag = response.headers.get("ETag")
+                state.last_modified = response.headers.get("Last-Modified")
+                return await response.text(), url, time.perf_counter() - start
+            elif response.status != 304:
+                print(f"Failed to fetch {url}: Status {response.status}")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"Error fetching {url}: {e}")
+    return None, url, time.perf_counter() - start
+
+
+async def stream_feeds(session, states):
+    """Yields each feed as soon as it arrives, so one slow host doesn't hold up the rest."""
+    for next_feed in asyncio.as_completed([fetch_feed(session, state) for state in states]):
+        yield await next_feed
+
+
+def parse_feed(result_text, url, threshold):
+    """Parses one feed document into news items published at or after `threshold` (a UTC timestamp)."""
+    feed = feedparser.parse(result_text)
+
+    # The "BBC News" or "The Register" part, rather than the specific author
+    website_name = feed.feed.get('title', url)
+
+    items = []
+    for entry in feed.entries:
+        pub_date_parsed = entry.get('published_parsed')
+        if pub_date_parsed:
+            published_ts = calendar.timegm(pub_date_parsed)
+
+            if published_ts >= threshold:
+                link = entry.get('link', 'No Link')
+                items.append({
+                    'title': entry.get('title', 'No Title'),
+                    'link': link,
+                    'published': entry.get('published', 'No Date'),
+                    'publisher': website_name,
+                    'guid': entry.get('id') or link,
+                    'published_ts': published_ts
+                })
+    return items
+
+
+def parse_feed_packed(result_text, url, threshold):
+    """Worker-process entry point: parse_feed, returned as one packed blob."""
+    return pack_items(parse_feed(result_text, url, threshold))
+
+
+def pack_items(items):
+    """Serializes items as compact JSON rows (no repeated keys) in one bytes object."""
+    return json.dumps([[item[field] for field in ITEM_FIELDS] for item in items],
+                      separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def unpack_items(blob):
+    return [dict(zip(ITEM_FIELDS, row)) for row in json.loads(blob)]
+
+
+def format_news_item(item):
+    """Display string for one item: 'PUBLISHER: Headline' with the publisher highlighted."""
+    return f"[bg:#FFFF00][fg:#000000]{item['publisher'].upper()}:[fg:#ffffff][bg:#000000] {item['title']}"
+
+
+class SeenIndex:
+    """Bounded set of story keys (guid, else link); the least recently seen key is forgotten first."""
+    def __init__(self, max_size=SEEN_INDEX_SIZE):
+        self.max_size = max_size
+        self._keys = OrderedDict()
+
+    def add(self, key):
+        """Records key; returns True if it was not already known."""
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return False
+        self._keys[key] = None
+        if len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
+        return True
+
+    def __len__(self):
+        return len(self._keys)
+
 
 class Singleton(type):
     def __init__(cls, name, bases, dict):
@@ -15,102 +183,159 @@ class Singleton(type):
 
 class NewsParser(object):
     __metaclass__ = Singleton
-    def __init__(self):
-        self.feeds = [
-            "https://smartermsp.com/feed/",
-            "https://mspmastered.com/feed/",
-            "https://www.theregister.com/headlines.atom",
-            "https://stackoverflow.blog/feed/atom/",
-            "https://www.bleepingcomputer.com/feed/",
-            "https://us-cert.cisa.gov/ncas/alerts.xml",
-            "https://api.msrc.microsoft.com/update-guide/rss",
-            "http://feeds.arstechnica.com/arstechnica/index?format=xml",
-            "https://www.cloudtango.net/blog/feed/",
-            "https://www.ninjaone.com/blog/category/growth/feed/",
-            "https://feeds.bbci.co.uk/news/technology/rss.xml"
-
-        ]
-        self.refresh_interval = 600 # Max Seconds before refreshing the news feed.
+    def __init__(self, feeds=None, refresh_interval=600, use_worker_process=True, snapshot_path=NEWS_SNAPSHOT_PATH):
+        self.feeds = list(feeds) if feeds is not None else list(DEFAULT_FEEDS)
+        self.refresh_interval = refresh_interval # Starting poll interval (seconds) for every feed; each then adapts
         self._news_items = []
         self._upcoming_news_items = []
         self.update_pending = False
-        self._last_refresh = None
         self._current_item_index = 0
+        self.use_worker_process = use_worker_process # Parse feeds in scripts.workerPool rather than in this process
+        self.feed_timings = {}
+        self._seen = SeenIndex()
+        self._feed_states = {}
+        self._session = None
+        self.snapshot_path = snapshot_path # None disables the on-disk snapshot
 
-    async def _fetch_feed_data(self, session, url):
-        """Asynchronously fetches a single feed URL."""
+    def load_snapshot(self):
+        """
+        Synchronously loads the last saved item list (dropping stories now outside the
+        window), so headlines show before the first fetch completes. Returns the item count.
+        """
+        if not self.snapshot_path:
+            return 0
         try:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    return await response.text(), url
-                else:
-                    print(f"Failed to fetch {url}: Status {response.status}")
-        except aiohttp.ClientError as e:
-            print(f"Error fetching {url}: {e}")
-        return None, url
-    
+            with open(self.snapshot_path, "rb") as f:
+                items = unpack_items(f.read())
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable news snapshot {self.snapshot_path}: {e}")
+            return 0
+
+        threshold = time.time() - NEWS_WINDOW_HOURS * 3600
+        items = [item for item in items if item['published_ts'] >= threshold]
+        for item in items:
+            self._seen.add(item['guid'])
+        self._news_items = items
+        self._current_item_index = 0
+        return len(items)
+
+    def save_snapshot(self, items):
+        """Atomically replaces the snapshot with `items` (write to a temp file, then rename)."""
+        if not self.snapshot_path:
+            return
+        tmp_path = self.snapshot_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(pack_items(items))
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            print(f"Could not save news snapshot to {self.snapshot_path}: {e}")
+
+    def _get_session(self):
+        # One pooled session for the parser's lifetime, created inside the running event loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=8, ttl_dns_cache=3600),
+                timeout=aiohttp.ClientTimeout(total=30)
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _due_feeds(self, now):
+        due = []
+        for url in self.feeds:
+            state = self._feed_states.get(url)
+            if state is None:
+                state = self._feed_states[url] = FeedState(url, self.refresh_interval)
+            if state.next_due <= now:
+                due.append(state)
+        return due
+
     async def refresh_news_feed(self):
-        """Fetches all feeds concurrently if the interval has passed."""
-        
-        # Check if we need to refresh based on the interval
-        if self._last_refresh and (datetime.now() - self._last_refresh) < timedelta(seconds=self.refresh_interval):
-            # print("Refresh interval not yet passed, skipping.")
+        """
+        Polls every feed that is due. Each feed is parsed as soon as it arrives and its unseen
+        stories are merged into the upcoming list straight away. Cheap to call often: feeds
+        that aren't due are skipped without touching the network.
+        """
+        due = self._due_feeds(time.monotonic())
+        if not due:
             return
 
-        print("\nRefreshing news feeds asynchronously...")
-        self._last_refresh = datetime.now()
-        
-        # Calculate the threshold time (6 hours ago) in UTC
-        six_hours_ago = datetime.now(ZoneInfo("UTC")) - timedelta(hours=12) # i don't want to rename the variable but i changed it to 12 hours
-
-        # Use a single aiohttp session for efficiency
-        async with aiohttp.ClientSession() as session:
-            # Create a list of async tasks to run concurrently
-            tasks = [self._fetch_feed_data(session, url) for url in self.feeds]
-            # Run them all at the same time and wait for all results
-            results_with_urls = await asyncio.gather(*tasks)
-
-        all_entries = []
-        for result_tuple in results_with_urls:
-            if result_tuple is None: continue
-            result_text, url = result_tuple
-
-            if result_text:
-                feed = await asyncio.to_thread(feedparser.parse, result_text)
-                await asyncio.sleep(0)
-                
-                # --- FIX: Get the Website Name from the Feed Metadata ---
-                # This is the "BBC News" or "The Register" part.
-                website_name = feed.feed.get('title', url) 
-
-                for entry in feed.entries:
-                    pub_date_parsed = entry.get('published_parsed')
-                    if pub_date_parsed:
-                        pub_date_datetime = datetime(*pub_date_parsed[:6], tzinfo=ZoneInfo("UTC"))
-
-                        if pub_date_datetime >= six_hours_ago:
-                            all_entries.append({
-                                'title': entry.get('title', 'No Title'),
-                                'link': entry.get('link', 'No Link'),
-                                'published': entry.get('published', 'No Date'),
-                                # Store the website name instead of the specific author
-                                'publisher': website_name 
-                            })
-        
-        # Sort all news items by date (optional, but good practice for recent news)
-        # We can sort using our new 'published_datetime' key if we store it, 
-        # but sorting by the 'published' string works fine for reverse chronological order in most cases.
-        # all_entries.sort(key=lambda item: item['published'], reverse=True) 
-        random.shuffle(all_entries)
-        self._upcoming_news_items = all_entries
-        self.update_pending = True
-        print(f"News refresh complete. Total items found in last 6 hours: {len(self._upcoming_news_items)}")
+        print(f"\nRefreshing {len(due)} news feed(s) asynchronously...")
+        threshold = time.time() - NEWS_WINDOW_HOURS * 3600
 
+        # Stories still inside the window carry over; expired ones drop out
+        base = self._upcoming_news_items if self.update_pending else self._news_items
+        upcoming = [item for item in (base or []) if item['published_ts'] >= threshold]
+        expired = len(base or []) - len(upcoming)
+        if expired:
+            self._upcoming_news_items = upcoming
+            self.update_pending = True
+
+        added = 0
+        async for result_text, url, fetch_seconds in stream_feeds(self._get_session(), due):
+            state = self._feed_states[url]
+            timings = self.feed_timings[url] = {"fetch_ms": fetch_seconds * 1000, "parse_ms": 0.0, "items": 0,
+                                                "new": 0, "status": state.last_status}
+            if not result_text:
+                state.schedule(time.monotonic())
+                timings["next_poll_s"] = state.next_due - time.monotonic()
+                continue
+
+            start = time.perf_counter()
+            if self.use_worker_process:
+                # feedparser runs in the worker process, so it never holds this process's GIL;
+                # only the packed items cross back.
+                from scripts import workerPool
+                items = unpack_items(await workerPool.run(parse_feed_packed, result_text, url, threshold))
+            else:
+                items = await asyncio.to_thread(parse_feed, result_text, url, threshold)
+            timings["parse_ms"] = (time.perf_counter() - start) * 1000
+            timings["items"] = len(items)
+            state.schedule(time.monotonic(), items)
+            timings["next_poll_s"] = state.next_due - time.monotonic()
+
+            new_items = [item for item in items if self._seen.add(item['guid'])]
+            if not new_items:
+                continue
+            timings["new"] = len(new_items)
+            added += len(new_items)
+
+            # Shuffled in among the existing stories; published as a new list each time, so
+            # next_news swaps in a complete list whenever the current scroll ends.
+            upcoming = list(upcoming)
+            for item in new_items:
+                upcoming.insert(random.randrange(len(upcoming) + 1), item)
+            self._upcoming_news_items = upcoming
+            self.update_pending = True
+
+        if added or expired:
+            await asyncio.to_thread(self.save_snapshot, upcoming)
+
+        polled = [self.feed_timings[state.url] for state in due]
+        slowest = max(due, key=lambda state: self.feed_timings[state.url]["fetch_ms"] + self.feed_timings[state.url]["parse_ms"])
+        slowest_ms = self.feed_timings[slowest.url]["fetch_ms"] + self.feed_timings[slowest.url]["parse_ms"]
+        unchanged = sum(1 for timings in polled if timings["status"] == 304)
+        print(f"News refresh complete. {added} new items, {len(upcoming)} in the last {NEWS_WINDOW_HOURS} hours, "
+              f"{unchanged} feed(s) unchanged. Slowest feed: {slowest.url} ({slowest_ms:.0f} ms).")
+
+    def get_feed_timings(self):
+        """Per-feed results of each feed's latest poll: fetch_ms, parse_ms, items, new, status, next_poll_s."""
+        return self.feed_timings
 
     def get_news_feed(self):
         """Returns the last cached list of news items."""
         return self._news_items
     
+    @validity.inline
+    @validity.until("next_news")
     def get_current_news_str(self) -> str:
         """
         Gets the news item currently selected by the index.
@@ -121,10 +346,39 @@ class NewsParser(object):
             return "[bg:#FFFF00][fg:#000000]Loading news...[bg:#000000][fg:#FFFFFF] Please wait for initial sync."
         
         # Get the current item using the index
-        item = self._news_items[self._current_item_index]
-            
-        return f"[bg:#FFFF00][fg:#000000]{item['publisher'].upper()}:[fg:#ffffff][bg:#000000] {item['title']}"
+        return format_news_item(self._news_items[self._current_item_index])
 
+    def lookahead(self, count):
+        """
+        The strings get_current_news_str will return after each of the next `count` calls to
+        next_news, in order. Follows a pending list swap, so a refresh changes the answer.
+        """
+        if self.update_pending:
+            items = self._upcoming_news_items
+            index = self._resume_index(items)
+        else:
+            items, index = self._news_items, self._current_item_index
+        if not items:
+            return []
+        return [format_news_item(items[(index + 1 + i) % len(items)]) for i in range(min(count, len(items)))]
+
+    def _resume_index(self, items):
+        """
+        Index in a refreshed list to advance from, so the rotation carries on after the story
+        on screen instead of restarting at the head. If that story dropped out, it resumes
+        at the next story of the current list that is still there (or at the head).
+        """
+        if not self._news_items or not items:
+            return -1
+        positions = {item['guid']: i for i, item in enumerate(items)}
+        count = len(self._news_items)
+        for step in range(count):
+            position = positions.get(self._news_items[(self._current_item_index + step) % count]['guid'])
+            if position is not None:
+                return position if step == 0 else position - 1
+        return -1
+
+    @validity.invalidates("next_news")
     def next_news(self):
         """
         Advances the internal index to select the next news item in the list.
@@ -132,7 +386,8 @@ class NewsParser(object):
         """
 
         if self.update_pending:
-            self._current_item_index = 0
+            # Merged or expired stories: keep the rotation's place in the new list
+            self._current_item_index = self._resume_index(self._upcoming_news_items)
             self._news_items = self._upcoming_news_items
             self.update_pending = False
             self._upcoming_news_items = 0
@@ -1,11 +1,79 @@
-from zoneinfo import ZoneInfo
-from datetime import datetime, timedelta
-import requests
+import html, re, time
+from collections import OrderedDict, deque
+from scripts.api import validity
+
+MAX_MESSAGES = 50 # Ring buffer: only the latest messages are shown, the oldest drop out
+SEEN_INDEX_SIZE = 1024 # Message ids remembered so a redelivered message is not shown twice
+MAX_MESSAGE_CHARS = 280
+_TAG_PATTERN = re.compile(r"<[^>]+>")
+_SPACE_PATTERN = re.compile(r"\s+")
+
+
+def plain_text(content):
+    """Teams bodies are HTML: strips tags and entities, collapses whitespace and caps the length."""
+    text = _SPACE_PATTERN.sub(" ", html.unescape(_TAG_PATTERN.sub(" ", content or ""))).strip()
+    if len(text) > MAX_MESSAGE_CHARS:
+        text = text[:MAX_MESSAGE_CHARS - 3].rstrip() + "..."
+    # A literal '[fg:' or '[bg:' in a message must not switch the ticker's colours
+    return text.replace("[", "(").replace("]", ")")
+
+
+def parse_message(payload):
+    """
+    Normalizes one pushed message into {'id', 'publisher', 'title', 'received_ts'}. Accepts
+    a Teams outgoing-webhook activity (from.name, text) or a Graph chatMessage
+    (from.user.displayName, body.content). Raises ValueError if it has no id or no text.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("expected a JSON object")
+    message_id = payload.get("id")
+    if not message_id:
+        raise ValueError("message has no id")
+
+    sender = payload.get("from") or {}
+    if isinstance(sender, dict):
+        user = sender.get("user") or {}
+        publisher = sender.get("name") or user.get("displayName") or "Teams"
+    else:
+        publisher = str(sender)
+
+    body = payload.get("body")
+    content = body.get("content") if isinstance(body, dict) else payload.get("text")
+    title = plain_text(content)
+    if not title:
+        raise ValueError("message has no text")
+    return {"id": str(message_id), "publisher": plain_text(publisher), "title": title, "received_ts": time.time()}
+
+
+def format_teams_message(item):
+    """Display string for one message: 'SENDER: Message' with the sender highlighted."""
+    return f"[bg:#FFFF00][fg:#000000]{item['publisher'].upper()}:[fg:#ffffff][bg:#000000] {item['title']}"
+
+
+class SeenIds:
+    """Bounded set of message ids; the least recently seen id is forgotten first."""
+    def __init__(self, max_size=SEEN_INDEX_SIZE):
+        self.max_size = max_size
+        self._ids = OrderedDict()
+
+    def add(self, message_id):
+        """Records message_id; returns True if it was not already known."""
+        if message_id in self._ids:
+            self._ids.move_to_end(message_id)
+            return False
+        self._ids[message_id] = None
+        if len(self._ids) > self.max_size:
+            self._ids.popitem(last=False)
+        return True
+
+    def __len__(self):
+        return len(self._ids)
+
 
 class Singleton(type):
     def __init__(cls, name, bases, dict):
         super(Singleton, cls).__init__(name, bases, dict)
-        cls.instance = None 
+        cls.instance = None
 
     def __call__(cls,*args,**kw):
         if cls.instance is None:
@@ -14,42 +82,79 @@ class Singleton(type):
 
 
 class TeamsParser(object):
+    """
+    Holds the latest Teams messages. Nothing is polled: messages are pushed in through
+    `ingest` (see scripts/teamsWebhook.py), deduped by id and formatted for the ticker as
+    they arrive, so get_current_teams_str is only an index into ready strings.
+    """
     __metaclass__ = Singleton
-    def __init__(self):
-        self.refresh_interval = 600 # Max Seconds before refreshing the news feed.
-        self._teams_messages = []
-        self._new_teams_messages = []
+    def __init__(self, max_messages=MAX_MESSAGES):
+        self._buffer = deque(maxlen=max_messages) # Newest last; formatted ticker strings
+        self._teams_messages = ()
+        self._upcoming_teams_messages = ()
         self.update_pending = False
-        self._last_refresh = None
         self._current_item_index = 0
-    
-    async def refresh_teams_feed(self):
-        """Checks for new Teams messages since the last refresh."""
-        
-        # Check if we need to refresh based on the interval
-        if self._last_refresh and (datetime.now() - self._last_refresh) < timedelta(seconds=self.refresh_interval):
-            # print("Refresh interval not yet passed, skipping.")
-            return
-        self._last_refresh = datetime.now()
+        self._seen = SeenIds()
+        self.received = 0
+        self.duplicates = 0
+        self.last_received = None
+
+    def ingest(self, payloads):
+        """
+        Adds pushed messages (one payload or a list of them). Returns how many were new;
+        messages whose id was already seen are dropped. Raises ValueError on a malformed
+        payload, after keeping any valid ones that came before it.
+        """
+        if isinstance(payloads, dict):
+            payloads = [payloads]
+        added = 0
+        try:
+            for payload in payloads:
+                item = parse_message(payload)
+                self.received += 1
+                if not self._seen.add(item["id"]):
+                    self.duplicates += 1
+                    continue
+                self._buffer.append(format_teams_message(item))
+                self.last_received = item["received_ts"]
+                added += 1
+        finally:
+            if added:
+                # Published as a new tuple, so next_message swaps in a complete list when
+                # the current scroll ends; the newest message is shown first.
+                self._upcoming_teams_messages = tuple(reversed(self._buffer))
+                self.update_pending = True
+                if not self._teams_messages:
+                    # Nothing is scrolling yet, so there is no scroll end to wait for
+                    self.next_message()
+        return added
 
     def get_teams_feed(self):
-        """Returns the last cached list of teams messages."""
-        return self._teams_messages
-    
+        """Returns the list of messages currently being shown, newest first."""
+        return list(self._teams_messages)
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "buffered": len(self._buffer),
+            "pending": self.update_pending,
+        }
+
+    @validity.inline
+    @validity.until("next_message")
     def get_current_teams_str(self) -> str:
         """
         Gets the teams item currently selected by the index.
         Format: 'SENDER: Message'
         """
-        if not self._teams_messages or len(self._teams_messages) == 0:
+        if not self._teams_messages:
             # Fallback text if the list is empty
             return "No new messages!"
-        
-        # Get the current item using the index
-        item = self._teams_messages[self._current_item_index]
-            
-        return f"[bg:#FFFF00][fg:#000000]{item['publisher'].upper()}:[fg:#ffffff][bg:#000000] {item['title']}"
 
+        return self._teams_messages[self._current_item_index]
+
+    @validity.invalidates("next_message")
     def next_message(self):
         """
         Advances the internal index to select the next news item in the list.
@@ -57,17 +162,18 @@ class TeamsParser(object):
         """
 
         if self.update_pending:
+            # Newer messages arrived: start again from the newest
             self._current_item_index = 0
             self._teams_messages = self._upcoming_teams_messages
             self.update_pending = False
-            self._upcoming_teams_messages = 0
+            return
 
         if not self._teams_messages:
             return # Cannot advance if there are no items
-            
+
         # Increment the index
         self._current_item_index += 1
-        
+
         # If we reach the end of the list, loop back to the start (0)
         if self._current_item_index >= len(self._teams_messages):
-            self._current_item_index = 0
\ No newline at end of file
+            self._current_item_index = 0
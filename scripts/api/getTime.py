@@ -1,7 +1,10 @@
 from zoneinfo import ZoneInfo
 from datetime import datetime
 import asyncio
+from scripts.api import validity
 
+@validity.inline
+@validity.ttl(1, align=True)
 def get_24hr_time(timezone_str):
     try:
         tz = ZoneInfo(timezone_str)
@@ -11,6 +14,8 @@ def get_24hr_time(timezone_str):
     now = datetime.now(tz)
     return now.strftime("%H:%M:%S")
 
+@validity.inline
+@validity.ttl(1, align=True)
 def get_12hr_time(timezone_str):
     try:
         tz = ZoneInfo(timezone_str)
@@ -18,4 +23,12 @@ def get_12hr_time(timezone_str):
         return f"Unknown timezone: {timezone_str}"
     
     now = datetime.now(tz)
-    return now.strftime("%I:%M:%S %p")
\ No newline at end of file
+    return now.strftime("%I:%M:%S %p")
+
+@validity.inline
+@validity.ttl(1, align=True)
+def get_time(timezone="UTC", format="24hr"):
+    """Entry point for the 'time' dataSource: dataParams {"timezone": ..., "format": "24hr"|"12hr"}."""
+    if format == "12hr":
+        return get_12hr_time(timezone)
+    return get_24hr_time(timezone)
@@ -0,0 +1,77 @@
+import functools
+import time
+
+# Event name -> number of times it has fired. Readers compare against the epoch
+# they last saw to decide whether a cached value is still valid.
+_EPOCHS = {}
+_LISTENERS = []
+
+
+def ttl(seconds, align=False):
+    """
+    Declares that a data source's value stays valid for `seconds`.
+    With align=True the value expires on wall-clock multiples of `seconds`
+    (e.g. exactly when the displayed second ticks over).
+    """
+    def decorator(func):
+        func.valid_for = seconds
+        func.valid_aligned = align
+        return func
+    return decorator
+
+
+def until(event):
+    """Declares that a data source's value stays valid until `event` fires."""
+    def decorator(func):
+        func.valid_until = event
+        return func
+    return decorator
+
+
+def inline(func):
+    """
+    Marks a data source as cheap (no I/O, no heavy work), so schedulers may run it on the
+    event loop. Unmarked sources are assumed slow and run off it.
+    """
+    func.inline = True
+    return func
+
+
+def invalidates(event):
+    """Fires `event` every time the decorated function is called."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                fire(event)
+        return wrapper
+    return decorator
+
+
+def fire(event):
+    _EPOCHS[event] = _EPOCHS.get(event, 0) + 1
+    for listener in _LISTENERS:
+        listener(event)
+
+
+def subscribe(listener):
+    """Registers `listener(event)` to be called whenever an event fires."""
+    _LISTENERS.append(listener)
+
+
+def epoch(event):
+    return _EPOCHS.get(event, 0)
+
+
+def expiry(func, now=None):
+    """Returns the wall-clock time at which a ttl-declared value expires (0 = always stale)."""
+    seconds = getattr(func, "valid_for", None)
+    if not seconds:
+        return 0
+    if now is None:
+        now = time.time()
+    if getattr(func, "valid_aligned", False):
+        return (now // seconds + 1) * seconds
+    return now + seconds
@@ -0,0 +1,411 @@
+"""
+Headless render benchmark: runs draw_sun_gradient + draw_layout for N frames against an
+offscreen canvas and a fake clock, so no Pi, pygame window or network is needed. Images
+and headlines are fixed in-memory stand-ins; nothing is fetched or read from cache/.
+
+    python -m scripts.benchmark                       # run every layout, compare to the baseline
+    python -m scripts.benchmark --save-baseline       # record this machine's baseline
+    python -m scripts.benchmark --layouts stress-large --backends numpy --frames 2000
+
+Baselines are machine specific; save one on the device you want to guard. Any layout whose
+fps, p99 or allocations regress past --tolerance makes the run exit with status 1.
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import re
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(PROJECT_ROOT, "benchmark-baseline.json")
+PANEL_WIDTH, PANEL_HEIGHT = 64 * 8, 32
+FRAME_TIME = 0.01
+
+STRESS_FONTS = ["4x6.bdf", "5x7.bdf", "5x8.bdf", "6x10.bdf", "6x13B.bdf", "7x13.bdf",
+                "8x13.bdf", "9x15.bdf", "clR6x12.bdf", "helvR12.bdf", "tom-thumb.bdf"]
+STRESS_COLORS = ["#FF0000", "#00FF00", "#0000FF", "#FFFF00", "#FF00FF", "#00FFFF", "#FFFFFF"]
+STRESS_WORDS = ["patch", "outage", "release", "zero-day", "advisory", "cloud", "update", "breach",
+                "firmware", "network", "customer", "service", "rollout", "incident", "vendor"]
+
+
+# --- Offscreen stand-ins ---
+
+class OffscreenCanvas:
+    """
+    Matrix canvas stand-in: SetPixel/Clear/Fill into a bytearray. It allocates nothing per
+    call, so allocation figures only count the renderer's own work.
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.pixels = bytearray(width * height * 3)
+        self._view = memoryview(self.pixels) # slice-assigning a bytearray itself copies the source first
+        self._blank = bytes(width * height * 3)
+        self.image = None
+
+    def SetPixel(self, x, y, r, g, b):
+        x, y = int(x), int(y)
+        if 0 <= x < self.width and 0 <= y < self.height:
+            i = (y * self.width + x) * 3
+            pixels = self.pixels
+            pixels[i] = r
+            pixels[i + 1] = g
+            pixels[i + 2] = b
+
+    def Clear(self):
+        self._view[:] = self._blank
+
+    def Fill(self, r, g, b):
+        pixels = self.pixels
+        pixels[0::3], pixels[1::3], pixels[2::3] = (bytes((r,)) * (self.width * self.height),
+                                                    bytes((g,)) * (self.width * self.height),
+                                                    bytes((b,)) * (self.width * self.height))
+
+    def SetImage(self, image, x=0, y=0):
+        # The real canvas copies the image out; keeping a reference is enough here
+        self.image = image
+
+
+class OffscreenMatrix:
+    """RGBMatrix stand-in with two canvases flipped by SwapOnVSync."""
+    def __init__(self, width=PANEL_WIDTH, height=PANEL_HEIGHT):
+        self.width = width
+        self.height = height
+        self._canvases = [OffscreenCanvas(width, height), OffscreenCanvas(width, height)]
+        self.swaps = 0
+
+    def CreateFrameCanvas(self):
+        return self._canvases[0]
+
+    def SwapOnVSync(self, canvas):
+        self.swaps += 1
+        return self._canvases[self.swaps % 2]
+
+
+class OfflineImageCache:
+    """
+    ImageCache stand-in: every source is the same fixed gradient fitted to the requested
+    box, so Image objects cost what a cached image does without fetching or reading files.
+    """
+    def __init__(self):
+        self._frames = {}
+
+    async def load(self, source, width, height):
+        frames = self._frames.get((width, height))
+        if frames is None:
+            from PIL import Image
+            from scripts import imageCache
+            image = Image.linear_gradient("L").resize((width, height)).convert("RGBA")
+            frames = self._frames[(width, height)] = imageCache.ImageFrames(width, height)
+            frames.add(image, imageCache.DEFAULT_FRAME_DURATION)
+        return frames
+
+    async def prefetch(self, sources):
+        pass
+
+    def stats(self):
+        return {"images": len(self._frames), "bytes": sum(f.nbytes for f in self._frames.values())}
+
+
+class FakeClock:
+    """Advances exactly one frame per tick, so scrolling and time sources are reproducible."""
+    def __init__(self, start):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def tick(self, dt):
+        self.now += dt
+
+
+def fake_datetime(clock):
+    class FakeDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.fromtimestamp(clock.now, tz)
+    return FakeDatetime
+
+
+# --- Loading the ticker ---
+
+def load_ticker(clock):
+    """
+    Imports __main__.py as a module (its entry point does not run) on the fake clock, with
+    offline images and headlines.
+    """
+    os.chdir(PROJECT_ROOT) # fonts, layouts and schemas are loaded relative to the project
+    if PROJECT_ROOT not in sys.path:
+        sys.path.insert(0, PROJECT_ROOT)
+    spec = importlib.util.spec_from_file_location("ledticker", os.path.join(PROJECT_ROOT, "__main__.py"))
+    ticker = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(ticker)
+    ticker.load_matrix_library() # the canvas backend draws with its graphics module
+
+    from scripts import dataScheduler
+    ticker.Scheduler = dataScheduler.DataScheduler(clock=clock)
+    ticker.datetime = fake_datetime(clock)
+    ticker._IMAGE_CACHE = OfflineImageCache()
+    from scripts.api import getNews
+    ticker.NewsParser = getNews.NewsParser(use_worker_process=False, snapshot_path=None)
+    seed_news(ticker.NewsParser, clock)
+    return ticker
+
+
+def seed_news(parser, clock, count=40, seed=7):
+    """Gives the news source offline headlines, so onScrollEnd keeps rotating text."""
+    rng = random.Random(seed)
+    parser._upcoming_news_items = [
+        {"title": " ".join(rng.choice(STRESS_WORDS) for _ in range(rng.randint(6, 16))).capitalize(),
+         "link": f"https://example.com/{i}", "published": "", "publisher": f"Feed {i % 5}",
+         "guid": f"https://example.com/{i}", "published_ts": clock.now}
+        for i in range(count)
+    ]
+    parser.update_pending = True
+    parser.next_news()
+
+
+# --- Layouts ---
+
+def strip_unknown_placeholders(layout, namespace):
+    """Replaces placeholders whose module isn't in `namespace` (e.g. {var:username}) with their name."""
+    def fix(text):
+        return re.sub(r'\{(.*?)\}', lambda m: m.group(0) if m.group(1).split(':')[0] in namespace else m.group(1), text)
+
+    def walk(objects):
+        for obj in objects:
+            if obj.get("text"):
+                obj["text"] = fix(obj["text"])
+            if obj.get("onScrollEnd"):
+                obj["onScrollEnd"] = fix(obj["onScrollEnd"])
+            walk(obj.get("objects", []))
+    walk(layout["objects"])
+    return layout
+
+
+def tagged_headline(rng, words):
+    parts = []
+    for _ in range(words):
+        if rng.random() < 0.2:
+            parts.append(f"[fg:{rng.choice(STRESS_COLORS)}]")
+        if rng.random() < 0.05:
+            parts.append(f"[bg:{rng.choice(STRESS_COLORS)}]")
+        parts.append(rng.choice(STRESS_WORDS) + " ")
+    return "".join(parts)
+
+
+def stress_layout(groups, depth, leaves, seed=1):
+    """Rows of nested Groups whose leaves are long tagged headlines in many fonts."""
+    rng = random.Random(seed)
+
+    def leaf(i):
+        obj = {
+            "type": "ScrollingTextbox" if i % 2 else "Textbox",
+            "x": f"{rng.randint(0, 60)}%", "y": "0px", "width": "100%", "height": "100%",
+            "text": tagged_headline(rng, rng.randint(10, 40)),
+            "font": rng.choice(STRESS_FONTS), "fgColor": rng.choice(STRESS_COLORS),
+        }
+        if obj["type"] == "ScrollingTextbox":
+            obj["scrollSpeed"] = 1
+        return obj
+
+    def group(level):
+        if level == depth:
+            children = [leaf(i) for i in range(leaves)]
+        else:
+            children = [group(level + 1)]
+        return {"type": "Group", "x": "0px", "y": "0px", "width": "100%", "height": "100%", "objects": children}
+
+    rows = []
+    for i in range(groups):
+        row = group(1)
+        row["y"] = f"{(i * 8) % PANEL_HEIGHT}px"
+        row["height"] = "14px"
+        rows.append(row)
+    return {"version": "1.0.0", "objects": rows}
+
+
+def load_layouts(ticker, names):
+    from scripts import validateSchema
+
+    available = {
+        "1.json": lambda: validateSchema.validate_layout("./layouts/1.json"),
+        # example.json documents every field rather than being a valid, runnable layout
+        "example.json": lambda: strip_unknown_placeholders(json.load(open("./layouts/example.json", encoding="utf-8")), vars(ticker)),
+        "stress-small": lambda: stress_layout(groups=12, depth=2, leaves=2),
+        "stress-large": lambda: stress_layout(groups=48, depth=4, leaves=3),
+    }
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise SystemExit(f"Unknown layout(s): {', '.join(unknown)} (choose from {', '.join(available)})")
+    return {name: available[name]() for name in names}
+
+
+# --- Running ---
+
+async def run_layout(ticker, clock, layout, backend, frames, warmup):
+    matrix = OffscreenMatrix()
+    canvas = matrix.CreateFrameCanvas()
+    frame = regions = None
+    if backend == "numpy":
+        from scripts.frameBuffer import FrameBuffer
+        from scripts import dirtyRegions
+        frame = FrameBuffer(matrix.width, matrix.height)
+        regions = dirtyRegions.DirtyRegions(frame.width, frame.height)
+
+    ticker._SPRITE_CACHE.clear()
+    objects = await ticker.unpack_layout(layout, panel_width=matrix.width, panel_height=matrix.height)
+    fonts_cache = ticker._FONT_CACHE
+    nodes = ticker.compile_layout(objects, fonts_cache)
+    scroll_state = {}
+
+    async def render(canvas):
+        ticker.Scheduler.refresh_due(clock.now)
+        target = frame if frame is not None else canvas
+        if regions is not None:
+            regions.begin_frame()
+        else:
+            target.Clear()
+        await ticker.draw_sun_gradient(matrix, target, regions)
+        await ticker.draw_layout(matrix, target, nodes, fonts_cache=fonts_cache,
+                                 scroll_state=scroll_state, dt=FRAME_TIME, regions=regions, now=clock.now)
+        if frame is not None:
+            regions.end_frame(frame)
+            frame.present(canvas)
+        clock.tick(FRAME_TIME)
+        return matrix.SwapOnVSync(canvas)
+
+    for _ in range(warmup):
+        canvas = await render(canvas)
+
+    times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        canvas = await render(canvas)
+        times.append(time.perf_counter() - start)
+
+    # Allocations are measured in a separate pass; tracing slows every frame down
+    alloc_frames = max(1, frames // 10)
+    tracemalloc.start()
+    peak_total = 0
+    blocks_before = sys.getallocatedblocks()
+    for _ in range(alloc_frames):
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        canvas = await render(canvas)
+        peak_total += tracemalloc.get_traced_memory()[1] - current
+    blocks_after = sys.getallocatedblocks()
+    tracemalloc.stop()
+
+    return summarize(times, len(nodes), peak_total / alloc_frames, (blocks_after - blocks_before) / alloc_frames)
+
+
+def summarize(times, node_count, alloc_bytes, net_blocks):
+    ordered = sorted(times)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000
+
+    total = sum(times)
+    return {
+        "nodes": node_count,
+        "frames": len(times),
+        "fps": len(times) / total if total else 0.0,
+        "p50_ms": percentile(50),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "max_ms": ordered[-1] * 1000,
+        "alloc_bytes_per_frame": alloc_bytes,
+        "net_blocks_per_frame": net_blocks,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Returns a message for every metric that regressed by more than `tolerance`."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result["fps"] < base["fps"] * (1 - tolerance):
+            regressions.append(f"{key}: fps {result['fps']:.0f} < baseline {base['fps']:.0f}")
+        if result["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{key}: p99 {result['p99_ms']:.2f} ms > baseline {base['p99_ms']:.2f} ms")
+        # Small absolute allowance so near-zero allocation baselines don't flap
+        if result["alloc_bytes_per_frame"] > base["alloc_bytes_per_frame"] * (1 + tolerance) + 1024:
+            regressions.append(f"{key}: {result['alloc_bytes_per_frame']:.0f} B allocated/frame "
+                               f"> baseline {base['alloc_bytes_per_frame']:.0f} B")
+    return regressions
+
+
+async def run(args):
+    clock = FakeClock(datetime(2026, 1, 1, 12, 0, 0).timestamp())
+    ticker = load_ticker(clock)
+    layouts = load_layouts(ticker, args.layouts)
+
+    results = {}
+    print(f"{'layout':<14} {'backend':<7} {'nodes':>5} {'fps':>9} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'max ms':>7} {'alloc/frame':>12}")
+    for name, layout in layouts.items():
+        for backend in args.backends:
+            result = await run_layout(ticker, clock, layout, backend, args.frames, args.warmup)
+            results[f"{name}/{backend}"] = result
+            print(f"{name:<14} {backend:<7} {result['nodes']:5d} {result['fps']:9.0f} {result['p50_ms']:7.2f} "
+                  f"{result['p95_ms']:7.2f} {result['p99_ms']:7.2f} {result['max_ms']:7.2f} "
+                  f"{result['alloc_bytes_per_frame'] / 1024:9.1f} KiB")
+
+    # Binding a layout leaves tasks behind (e.g. prefetch_resources waiting on FIRST_FRAME)
+    leftover = asyncio.all_tasks() - {asyncio.current_task()}
+    for task in leftover:
+        task.cancel()
+    await asyncio.gather(*leftover, return_exceptions=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless render benchmark for the LED ticker.")
+    parser.add_argument("--layouts", nargs="+", default=["1.json", "example.json", "stress-small", "stress-large"])
+    parser.add_argument("--backends", nargs="+", choices=("canvas", "numpy"), default=["canvas", "numpy"])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed regression, as a fraction")
+    parser.add_argument("--output", help="Also write this run's results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\nPERFORMANCE REGRESSION")
+        for message in regressions:
+            print(f"  {message}")
+        return 1
+    print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+import argparse
+import glob
+import os
+import time
+
+from scripts import fontAtlas
+
+
+def compile_all(fonts_dir, atlas_dir=fontAtlas.ATLAS_DIR, force=False):
+    """Compiles every BDF in fonts_dir into a glyph atlas; skips atlases that are already current."""
+    compiled = []
+    for bdf_path in sorted(glob.glob(os.path.join(fonts_dir, "*.bdf"))):
+        atlas_path = fontAtlas.atlas_path_for(bdf_path, atlas_dir)
+        if not force and fontAtlas.atlas_is_current(bdf_path, atlas_path):
+            continue
+        start = time.perf_counter()
+        fontAtlas.compile_font(bdf_path, atlas_path)
+        print(f"Compiled {os.path.basename(bdf_path)} -> {atlas_path} "
+              f"({os.path.getsize(atlas_path) / 1024:.0f} KiB, {time.perf_counter() - start:.1f}s)")
+        compiled.append(atlas_path)
+    return compiled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile BDF fonts into memory-mappable glyph atlases.")
+    parser.add_argument("--fonts-dir", default=os.path.dirname(fontAtlas.ATLAS_DIR))
+    parser.add_argument("--atlas-dir", default=fontAtlas.ATLAS_DIR)
+    parser.add_argument("--force", action="store_true", help="Recompile even if the atlas is current")
+    args = parser.parse_args()
+
+    compiled = compile_all(args.fonts_dir, args.atlas_dir, args.force)
+    print(f"{len(compiled)} font(s) compiled.")
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import time
+
+from scripts.api import validity
+
+DEFAULT_INTERVAL = 1.0 # Seconds between refreshes for sources that declare no validity
+
+
+class Source:
+    __slots__ = ("key", "func", "args", "kwargs", "event", "in_thread", "next_due", "running")
+
+    def __init__(self, key, func, args, kwargs, in_thread):
+        self.key = key
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.event = getattr(func, "valid_until", None)
+        self.in_thread = in_thread
+        self.next_due = 0
+        self.running = False
+
+    def due_after(self, now):
+        if self.event is not None:
+            return float("inf") # Only refreshed when its event fires
+        expires = validity.expiry(self.func, now)
+        return expires if expires else now + DEFAULT_INTERVAL
+
+
+class DataScheduler:
+    """
+    Owns every data source used by the layout and refreshes each on its own schedule,
+    publishing values into `snapshot`. The snapshot dict is never mutated in place, so
+    the render loop can read it at any point without locking or awaiting anything.
+
+    Sources run in a worker thread unless marked @validity.inline, so a slow source (or
+    a template naming any function) can never cost a frame; the cheap in-memory ones
+    are evaluated inline. Long-running upkeep (e.g. feed refreshes) runs as jobs.
+    """
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.snapshot = {}
+        self.version = 0
+        self._sources = {}
+        self._jobs = []
+        self._wake = None
+        validity.subscribe(self._on_event)
+
+    @staticmethod
+    def source_key(name, params=None):
+        if not params:
+            return name
+        return f"{name}:{json.dumps(params, sort_keys=True)}"
+
+    def register(self, key, func, args=(), kwargs=None):
+        """Adds a source (once per key). Inline sources get their first value immediately."""
+        source = self._sources.get(key)
+        if source is not None:
+            return source
+
+        source = Source(key, func, tuple(args), kwargs or {}, not getattr(func, "inline", False))
+        self._sources[key] = source
+        if not source.in_thread:
+            self._refresh_inline(source, self.clock())
+        elif self._wake is not None:
+            self._wake.set()
+        return source
+
+    def add_job(self, coro_func, interval):
+        """Runs `await coro_func()` every `interval` seconds alongside the sources."""
+        self._jobs.append((coro_func, interval))
+
+    def source(self, key):
+        return self._sources.get(key)
+
+    def get(self, key, default=None):
+        return self.snapshot.get(key, default)
+
+    def publish(self, key, value):
+        if value is not None:
+            value = str(value)
+        snapshot = self.snapshot
+        if key in snapshot and snapshot[key] == value:
+            return
+        snapshot = dict(snapshot)
+        snapshot[key] = value
+        self.snapshot = snapshot
+        self.version += 1
+
+    def refresh_due(self, now=None):
+        """Refreshes every due inline source; returns when the next source falls due."""
+        if now is None:
+            now = self.clock()
+        next_due = now + DEFAULT_INTERVAL
+        for source in self._sources.values():
+            if not source.in_thread and source.next_due <= now:
+                self._refresh_inline(source, now)
+            next_due = min(next_due, source.next_due)
+        return next_due
+
+    async def run(self):
+        self._wake = asyncio.Event()
+        job_tasks = [asyncio.create_task(self._run_job(*job)) for job in self._jobs]
+        try:
+            while True:
+                now = self.clock()
+                next_due = self.refresh_due(now)
+                for source in self._sources.values():
+                    if source.in_thread and not source.running and source.next_due <= now:
+                        source.running = True
+                        asyncio.create_task(self._refresh_threaded(source))
+
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), max(0.0, next_due - self.clock()))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in job_tasks:
+                task.cancel()
+
+    def _on_event(self, event):
+        # Event-driven sources are refreshed straight away, so the new value is
+        # in the snapshot before the frame that fired the event finishes.
+        for source in self._sources.values():
+            if source.event == event:
+                source.next_due = 0
+                if not source.in_thread:
+                    self._refresh_inline(source, self.clock())
+        if self._wake is not None:
+            self._wake.set()
+
+    def _refresh_inline(self, source, now):
+        source.next_due = source.due_after(now)
+        try:
+            self.publish(source.key, source.func(*source.args, **source.kwargs))
+        except Exception as e:
+            print(f"\nData source {source.key} failed: {e}")
+
+    async def _refresh_threaded(self, source):
+        try:
+            value = await asyncio.to_thread(source.func, *source.args, **source.kwargs)
+            self.publish(source.key, value)
+        except Exception as e:
+            print(f"\nData source {source.key} failed: {e}")
+        finally:
+            source.next_due = source.due_after(self.clock())
+            source.running = False
+            self._wake.set()
+
+    async def _run_job(self, coro_func, interval):
+        while True:
+            try:
+                await coro_func()
+            except Exception as e:
+                print(f"\nScheduled job {getattr(coro_func, '__qualname__', coro_func)} failed: {e}")
+            await asyncio.sleep(interval)
@@ -0,0 +1,105 @@
+def intersects(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def intersection(a, b):
+    """Overlap of two (x0, y0, x1, y1) rects, or None if they don't overlap."""
+    rect = (max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3]))
+    return rect if rect[0] < rect[2] and rect[1] < rect[3] else None
+
+
+def union(a, b):
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def merge_rects(rects):
+    """Coalesces overlapping (x0, y0, x1, y1) rects so no pixel is repainted twice."""
+    merged = []
+    for rect in rects:
+        while True:
+            for i, other in enumerate(merged):
+                if intersects(rect, other):
+                    rect = union(rect, merged.pop(i))
+                    break
+            else:
+                break
+        merged.append(rect)
+    return merged
+
+
+class DirtyRegions:
+    """
+    Incremental redraw for a persistent back buffer (the NumPy FrameBuffer).
+
+    Each frame, every layer (the sun gradient, each layout object) is submitted with a
+    state value, the rect it paints and a paint function. Only layers whose state changed
+    are damaged; at the end of the frame each damaged rect (old and new position) is
+    cleared and every layer touching it is repainted in order, clipped to the rect.
+    Everything else is left as it was in the previous frame.
+    """
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self._previous = {}
+        self._current = {}
+        self._full_redraw = True
+        self.last_pixels = 0
+        self.total_pixels = 0
+        self.frames = 0
+
+    def invalidate(self):
+        """Forces the next frame to be repainted in full (e.g. after a layout change)."""
+        self._full_redraw = True
+
+    def begin_frame(self):
+        self._current = {}
+
+    def layer(self, key, state, rect, paint, *args):
+        if rect is not None:
+            rect = (max(0, rect[0]), max(0, rect[1]), min(self.width, rect[2]), min(self.height, rect[3]))
+            if rect[0] >= rect[2] or rect[1] >= rect[3]:
+                rect = None
+        self._current[key] = (state, rect, paint, args)
+
+    def end_frame(self, frame):
+        current, previous = self._current, self._previous
+
+        if self._full_redraw:
+            dirty = [(0, 0, self.width, self.height)]
+            self._full_redraw = False
+        else:
+            damaged = []
+            for key, (state, rect, _, _) in current.items():
+                old = previous.get(key)
+                if old is not None and old[0] == state and old[1] == rect:
+                    continue
+                if rect is not None:
+                    damaged.append(rect)
+                if old is not None and old[1] is not None:
+                    damaged.append(old[1])
+            for key, old in previous.items():
+                if key not in current and old[1] is not None:
+                    damaged.append(old[1])
+            dirty = merge_rects(damaged)
+
+        pixels = 0
+        for rect in dirty:
+            frame.clip = rect
+            frame.fill_rect(rect[0], rect[1], rect[2] - rect[0], rect[3] - rect[1], 0, 0, 0)
+            for state, layer_rect, paint, args in current.values():
+                if layer_rect is not None and intersects(layer_rect, rect):
+                    paint(frame, *args)
+            pixels += (rect[2] - rect[0]) * (rect[3] - rect[1])
+        frame.clip = None
+
+        self._previous = current
+        self.last_pixels = pixels
+        self.total_pixels += pixels
+        self.frames += 1
+
+    def stats(self):
+        return {
+            "last_pixels": self.last_pixels,
+            "avg_pixels": self.total_pixels / self.frames if self.frames else 0.0,
+            "frame_pixels": self.width * self.height
+        }
@@ -0,0 +1,190 @@
+import mmap
+import os
+import struct
+
+import numpy as np
+
+# File layout (little-endian):
+#   header    MAGIC, then HEADER_FORMAT fields
+#   uint32    codepoints[n_glyphs]            sorted
+#   int16     advances[n_glyphs]              DWIDTH x of each glyph
+#   uint8     cells[n_glyphs][fbby][row_bytes] glyph drawn into the font bounding box, MSB first
+#   int16     widths[max_cp + 1]              dense CharacterWidth table (0 = no glyph)
+MAGIC = b"LEDATL01"
+HEADER_FORMAT = "<QQhhhhIIiH"
+HEADER_SIZE = len(MAGIC) + struct.calcsize(HEADER_FORMAT)
+MISSING_CODEPOINT = 0xFFFD
+
+ATLAS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "fonts", "compiled")
+
+
+def atlas_path_for(bdf_path, atlas_dir=ATLAS_DIR):
+    return os.path.join(atlas_dir, os.path.splitext(os.path.basename(bdf_path))[0] + ".atlas")
+
+
+def compile_font(bdf_path, atlas_path):
+    """Parses a BDF once with bdfparser and writes its binary glyph atlas (atomically)."""
+    import bdfparser
+
+    stat = os.stat(bdf_path)
+    font = bdfparser.Font(bdf_path)
+    headers = font.headers
+    fbbx, fbby = headers["fbbx"], headers["fbby"]
+    row_bytes = (fbbx + 7) // 8
+
+    codepoints = sorted(cp for cp in font.glyphs if cp >= 0) # unencoded glyphs use -1
+    advances = np.zeros(len(codepoints), dtype="<i2")
+    cells = np.zeros((len(codepoints), fbby, row_bytes * 8), dtype=np.uint8)
+    for i, cp in enumerate(codepoints):
+        glyph = font.glyphbycp(cp)
+        advances[i] = glyph.meta["dwx0"] or 0
+        for y, row in enumerate(glyph.draw().todata(2)):
+            cells[i, y, :len(row)] = row
+
+    max_cp = codepoints[-1] if codepoints else 0
+    widths = np.zeros(max_cp + 1, dtype="<i2")
+    widths[np.array(codepoints, dtype=np.int64)] = advances
+    default_cp = MISSING_CODEPOINT if MISSING_CODEPOINT in font.glyphs else -1
+
+    os.makedirs(os.path.dirname(atlas_path) or ".", exist_ok=True)
+    tmp_path = atlas_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack(HEADER_FORMAT, stat.st_size, stat.st_mtime_ns,
+                            fbbx, fbby, headers["fbbxoff"], headers["fbbyoff"],
+                            len(codepoints), max_cp, default_cp, row_bytes))
+        f.write(np.array(codepoints, dtype="<u4").tobytes())
+        f.write(advances.tobytes())
+        f.write(np.packbits(cells, axis=2).tobytes())
+        f.write(widths.tobytes())
+    os.replace(tmp_path, atlas_path)
+
+
+def atlas_is_current(bdf_path, atlas_path):
+    try:
+        stat = os.stat(bdf_path)
+        with open(atlas_path, "rb") as f:
+            head = f.read(HEADER_SIZE)
+    except OSError:
+        return False
+    if len(head) != HEADER_SIZE or not head.startswith(MAGIC):
+        return False
+    size, mtime_ns = struct.unpack_from("<QQ", head, len(MAGIC))
+    return size == stat.st_size and mtime_ns == stat.st_mtime_ns
+
+
+def load_atlas(bdf_path, atlas_dir=ATLAS_DIR, compile_stale=True):
+    """
+    Memory-maps the atlas for a BDF font, (re)compiling it first if missing or stale.
+    With compile_stale=False a missing or stale atlas raises OSError instead: parsing a
+    BDF takes long enough (most of a second for the larger fonts) that callers on the
+    event loop compile on a worker thread first.
+    """
+    atlas_path = atlas_path_for(bdf_path, atlas_dir)
+    if not atlas_is_current(bdf_path, atlas_path):
+        if not compile_stale:
+            raise OSError(f"No current glyph atlas for {bdf_path}")
+        compile_font(bdf_path, atlas_path)
+    return GlyphAtlas(bdf_path, atlas_path)
+
+
+class GlyphAtlas:
+    """
+    A compiled BDF font backed by a read-only memory map. Exposes the parts of
+    graphics.Font the renderer needs (height, CharacterWidth) plus array-based text
+    measurement and glyph rasterization for the sprite cache.
+    """
+    def __init__(self, path, atlas_path):
+        self.path = path
+        with open(atlas_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = self._mmap
+
+        (_, _, self.fbbx, self.fbby, self.fbbxoff, self.fbbyoff,
+         n_glyphs, max_cp, default_cp, row_bytes) = struct.unpack_from(HEADER_FORMAT, buf, len(MAGIC))
+
+        offset = HEADER_SIZE
+        self.codepoints = np.frombuffer(buf, dtype="<u4", count=n_glyphs, offset=offset)
+        offset += 4 * n_glyphs
+        self.advances = np.frombuffer(buf, dtype="<i2", count=n_glyphs, offset=offset)
+        offset += 2 * n_glyphs
+        self.cells = np.frombuffer(buf, dtype=np.uint8, count=n_glyphs * self.fbby * row_bytes,
+                                   offset=offset).reshape(n_glyphs, self.fbby, row_bytes)
+        offset += n_glyphs * self.fbby * row_bytes
+        self.widths = np.frombuffer(buf, dtype="<i2", count=max_cp + 1, offset=offset)
+
+        self.max_cp = max_cp
+        self.default_cp = default_cp if default_cp >= 0 else None
+        self.default_width = int(self.widths[default_cp]) if default_cp >= 0 else 0
+        self._glyph_pixels = {}
+
+    @property
+    def height(self):
+        return self.fbby
+
+    @property
+    def baseline(self):
+        return self.fbby + self.fbbyoff
+
+    def CharacterWidth(self, char):
+        return int(self.widths[char]) if 0 <= char <= self.max_cp else 0
+
+    def codepoints_of(self, text):
+        return np.frombuffer(text.encode("utf-32-le"), dtype="<u4")
+
+    def text_width(self, text):
+        """Sum of CharacterWidth over the text (missing glyphs count 0), as one array lookup."""
+        cps = self.codepoints_of(text)
+        return int(self.widths[cps[cps <= self.max_cp]].sum())
+
+    def advance_width(self, text):
+        """Width as DrawText reports it: missing or zero-width glyphs advance by the default glyph."""
+        cps = self.codepoints_of(text)
+        widths = np.zeros(len(cps), dtype=np.int64)
+        in_range = cps <= self.max_cp
+        widths[in_range] = self.widths[cps[in_range]]
+        widths[widths <= 0] = self.default_width
+        return int(widths.sum())
+
+    def glyph_pixels(self, cp):
+        """
+        Lit (x, y) pixels of a glyph, x from the pen position and y from the top of the
+        font bounding box, placed the way DrawText draws them: the cell is shifted back by
+        the font's x offset, and columns at or past the glyph's advance are dropped.
+        """
+        pixels = self._glyph_pixels.get(cp)
+        if pixels is None:
+            idx = self._glyph_index(cp)
+            if idx is not None:
+                bits = np.unpackbits(self.cells[idx], axis=1)[:, :self.fbbx]
+                ys, xs = np.nonzero(bits)
+                xs = xs + self.fbbxoff
+                keep = xs < int(self.advances[idx])
+                pixels = tuple(zip(xs[keep].tolist(), ys[keep].tolist()))
+            else:
+                pixels = ()
+            self._glyph_pixels[cp] = pixels
+        return pixels
+
+    def _glyph_index(self, cp):
+        idx = int(np.searchsorted(self.codepoints, cp))
+        if idx < len(self.codepoints) and self.codepoints[idx] == cp:
+            return idx
+        return None
+
+    def run_pixels(self, text):
+        """
+        Yields the lit pixels of a run of text relative to (run start, top of the bounding box),
+        matching graphics.DrawText: each glyph is drawn at the sum of the previous glyphs'
+        advances; unknown characters draw the default glyph, or nothing if there is none.
+        """
+        cursor = 0
+        for c in text:
+            cp = ord(c)
+            idx = self._glyph_index(cp)
+            if idx is None and self.default_cp is not None:
+                cp, idx = self.default_cp, self._glyph_index(self.default_cp)
+            if idx is not None:
+                for x, y in self.glyph_pixels(cp):
+                    yield cursor + x, y
+                cursor += int(self.advances[idx])
@@ -0,0 +1,77 @@
+"""
+Checks that text drawn from the glyph atlases (fontAtlas + spriteCache) lands on exactly
+the pixels graphics.DrawText lights, under the emulator's graphics module:
+
+    python -m scripts.fontParity                          # proportional and fixed-width fonts
+    python -m scripts.fontParity --fonts helvR12.bdf texgyre-27.bdf --text "Wavy AVA"
+
+Each sample is drawn both ways onto an offscreen canvas and the two compared pixel by
+pixel; any difference is reported and the run exits with status 1.
+"""
+import argparse
+import os
+import sys
+
+from scripts import fontAtlas, spriteCache
+from scripts.benchmark import OffscreenCanvas
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FONTS_DIR = os.path.join(PROJECT_ROOT, "fonts")
+DEFAULT_FONTS = ["helvR12.bdf", "texgyre-27.bdf", "clR6x12.bdf", "7x13.bdf", "tom-thumb.bdf"]
+SAMPLES = ["The quick brown fox jumps over the lazy dog", "AVAWAY (jfj) [x] {y} @#% 0123456789",
+           "Wavy llama, fijord; gyp!", "café über naïve – £1.99"]
+MARGIN = 24 # Room around the text for glyphs that reach past their advance or the line
+
+
+def draw_both(graphics, bdf_path, text, color):
+    """Returns (DrawText canvas, sprite canvas) for the text drawn at the same origin."""
+    font = graphics.Font()
+    font.LoadFont(bdf_path)
+    atlas = fontAtlas.load_atlas(bdf_path)
+    width = atlas.advance_width(text) + 2 * MARGIN
+    height = atlas.height + 2 * MARGIN
+    x, y = MARGIN, MARGIN + atlas.baseline
+
+    expected = OffscreenCanvas(width, height)
+    graphics.DrawText(expected, font, x, y, color, text)
+    actual = OffscreenCanvas(width, height)
+    spriteCache.SpriteCache().draw(actual, atlas, x, y, color, text)
+    return expected, actual
+
+
+def differences(expected, actual):
+    """(x, y) of every pixel lit on one canvas and not the other."""
+    diff = []
+    for i in range(0, len(expected.pixels), 3):
+        if expected.pixels[i:i + 3] != actual.pixels[i:i + 3]:
+            diff.append(((i // 3) % expected.width - MARGIN, (i // 3) // expected.width - MARGIN))
+    return diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare atlas-drawn text with graphics.DrawText pixel by pixel.")
+    parser.add_argument("--fonts", nargs="+", default=DEFAULT_FONTS, help="BDF files in the fonts directory")
+    parser.add_argument("--text", nargs="+", default=SAMPLES, help="Strings to draw")
+    args = parser.parse_args()
+
+    from RGBMatrixEmulator import graphics
+    color = graphics.Color(255, 255, 255)
+
+    failed = 0
+    for font_name in args.fonts:
+        bdf_path = os.path.join(FONTS_DIR, font_name)
+        for text in args.text:
+            diff = differences(*draw_both(graphics, bdf_path, text, color))
+            if diff:
+                failed += 1
+                print(f"MISMATCH {font_name} {text!r}: {len(diff)} pixel(s) differ, first at {diff[:5]}")
+        print(f"{font_name}: {len(args.text)} sample(s) checked")
+    if failed:
+        print(f"\n{failed} sample(s) differ from graphics.DrawText")
+        return 1
+    print("All samples match graphics.DrawText.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+OVERLOAD_WINDOW = 2.0 # Seconds of frames judged together before the rate changes
+OVERLOAD_LOAD = 0.9 # Share of the frame budget spent working that counts as overloaded
+RECOVER_LOAD = 0.5 # ...and low enough that the next rate up still leaves headroom
+FPS_STEP = 0.75 # Each overload step multiplies the target rate by this
+
+
+class FrameScheduler:
+    """
+    Paces the draw loop against absolute deadlines: frame n is due at anchor + n * period,
+    so time spent drawing or oversleeping one frame is taken out of the next sleep rather
+    than adding up. A frame that misses its deadline by a whole period gives up the missed
+    slots and re-anchors on the current time instead of rushing to catch up.
+
+    The loop calls `begin()` at the start of each frame (returning its monotonic time and
+    the real interval since the previous frame), `end()` once the frame is drawn (before the
+    swap, so waiting for vsync doesn't count as work), then awaits `wait()`. If the drawing work keeps taking more than OVERLOAD_LOAD of the budget
+    for OVERLOAD_WINDOW seconds, the target rate is lowered by FPS_STEP (not below min_fps);
+    after a window under RECOVER_LOAD it steps back up toward max_fps.
+    """
+    def __init__(self, max_fps, min_fps=20, clock=time.perf_counter, on_retarget=None):
+        self.max_fps = max_fps
+        self.min_fps = min(min_fps, max_fps)
+        self.clock = clock
+        self.on_retarget = on_retarget # Called with the new frame period whenever the rate changes
+        self.fps = max_fps
+        self.period = 1.0 / max_fps
+        self.retargets = 0
+        self.skipped = 0
+
+        self._anchor = None
+        self._slot = 0
+        self._frame_start = None
+        self._last_start = None
+        self._window_started = None
+        self._window_work = 0.0
+        self._window_frames = 0
+
+    def begin(self):
+        """Marks the start of a frame; returns (now, dt) with dt the measured frame interval."""
+        now = self.clock()
+        if self._anchor is None:
+            self._anchor = now
+            self._window_started = now
+        dt = now - self._last_start if self._last_start is not None else self.period
+        self._last_start = self._frame_start = now
+        return now, dt
+
+    def end(self):
+        """Marks the frame's work as done and updates the overload estimate."""
+        now = self.clock()
+        self._window_work += now - self._frame_start
+        self._window_frames += 1
+        elapsed = now - self._window_started
+        if elapsed >= OVERLOAD_WINDOW:
+            self._adapt(self._window_work / (self._window_frames * self.period))
+            self._window_started = now
+            self._window_work = 0.0
+            self._window_frames = 0
+
+    def _adapt(self, load):
+        fps = self.fps
+        if load > OVERLOAD_LOAD and fps > self.min_fps:
+            fps = max(self.min_fps, fps * FPS_STEP)
+        elif load < RECOVER_LOAD and fps < self.max_fps:
+            fps = min(self.max_fps, fps / FPS_STEP)
+        if fps != self.fps:
+            self.set_fps(fps)
+
+    def set_fps(self, fps):
+        """Changes the target rate; the next deadline is counted from now."""
+        self.fps = fps
+        self.period = 1.0 / fps
+        self.retargets += 1
+        self._anchor = self.clock()
+        self._slot = 0
+        if self.on_retarget is not None:
+            self.on_retarget(self.period)
+
+    def next_deadline(self):
+        """Works out when the next frame is due, dropping slots that have already passed."""
+        self._slot += 1
+        deadline = self._anchor + self._slot * self.period
+        now = self.clock()
+        if now - deadline >= self.period:
+            missed = int((now - deadline) / self.period)
+            self.skipped += missed
+            self._anchor = now
+            self._slot = 0
+            deadline = now
+        return deadline
+
+    async def wait(self):
+        """Sleeps until the next frame's deadline; always yields to the event loop at least once."""
+        delay = self.next_deadline() - self.clock()
+        await asyncio.sleep(delay if delay > 0 else 0)
+
+    def stats(self):
+        return {
+            "target_fps": self.fps,
+            "retargets": self.retargets,
+            "skipped_slots": self.skipped,
+        }
@@ -0,0 +1,159 @@
+import json
+import os
+import time
+from array import array
+
+BUCKET_WIDTH = 0.0001 # 0.1 ms histogram resolution
+BUCKET_COUNT = 1000   # up to 100 ms; slower frames land in the last bucket
+DEFAULT_STATS_PATH = "/tmp/ledticker-stats.json"
+
+
+class FrameStats:
+    """
+    Streaming frame-time statistics with O(1) cost per recorded frame.
+
+    - A fixed ring of the last `window` frame times with a running sum gives the
+      current FPS without re-reading the ring.
+    - A fixed-bucket histogram, reset at every report, gives p50/p95/p99 for the
+      reporting interval; percentiles are only computed when a report is made.
+    - A frame slower than `drop_factor` x the target counts as dropped.
+
+    `report` is rate-limited to `report_interval` seconds and, if `stats_path` is set,
+    atomically rewrites a JSON snapshot there so other processes can query it.
+    """
+    def __init__(self, target_frame_time, window=100, report_interval=1.0, stats_path=None, drop_factor=1.5):
+        self.target_frame_time = target_frame_time
+        self.drop_factor = drop_factor
+        self.drop_threshold = target_frame_time * drop_factor
+        self.report_interval = report_interval
+        self.stats_path = stats_path
+
+        self._ring = array('d', [0.0]) * window
+        self._ring_pos = 0
+        self._ring_len = 0
+        self._ring_sum = 0.0
+
+        self._buckets = array('L', [0]) * BUCKET_COUNT
+        self._interval_frames = 0
+        self._interval_dropped = 0
+        self._interval_max = 0.0
+
+        self.frames = 0
+        self.dropped = 0
+        self.total_time = 0.0
+        self.started = time.time()
+        self._next_report = time.monotonic() + report_interval
+        self.last_report = None
+
+    def set_target(self, target_frame_time):
+        """Follows a change of target rate (e.g. scripts.frameScheduler backing off)."""
+        self.target_frame_time = target_frame_time
+        self.drop_threshold = target_frame_time * self.drop_factor
+
+    def record(self, frame_time):
+        ring = self._ring
+        pos = self._ring_pos
+        self._ring_sum += frame_time - ring[pos]
+        ring[pos] = frame_time
+        self._ring_pos = (pos + 1) % len(ring)
+        if self._ring_len < len(ring):
+            self._ring_len += 1
+
+        bucket = int(frame_time / BUCKET_WIDTH)
+        self._buckets[bucket if bucket < BUCKET_COUNT else BUCKET_COUNT - 1] += 1
+        self._interval_frames += 1
+        if frame_time > self._interval_max:
+            self._interval_max = frame_time
+
+        self.frames += 1
+        self.total_time += frame_time
+        if frame_time > self.drop_threshold:
+            self.dropped += 1
+            self._interval_dropped += 1
+
+    @property
+    def current_fps(self):
+        return self._ring_len / self._ring_sum if self._ring_sum > 0 else 0.0
+
+    @property
+    def average_fps(self):
+        return self.frames / self.total_time if self.total_time > 0 else 0.0
+
+    def percentiles(self, *ps):
+        """Frame times (seconds, bucket upper edge) at each percentile for the current interval."""
+        total = self._interval_frames
+        if not total:
+            return [0.0 for _ in ps]
+        targets = sorted((p, i) for i, p in enumerate(ps))
+        results = [0.0] * len(ps)
+        seen = 0
+        t = 0
+        for bucket, count in enumerate(self._buckets):
+            if not count:
+                continue
+            seen += count
+            while t < len(targets) and seen >= targets[t][0] / 100 * total:
+                results[targets[t][1]] = (bucket + 1) * BUCKET_WIDTH
+                t += 1
+            if t == len(targets):
+                break
+        return results
+
+    def due(self, now=None):
+        return (now if now is not None else time.monotonic()) >= self._next_report
+
+    def report(self, extra=None, now=None):
+        """Builds (and publishes) a snapshot, then starts a new histogram interval."""
+        now = now if now is not None else time.monotonic()
+        p50, p95, p99 = self.percentiles(50, 95, 99)
+        snapshot = {
+            "time": time.time(),
+            "uptime": time.time() - self.started,
+            "current_fps": self.current_fps,
+            "average_fps": self.average_fps,
+            "target_fps": 1 / self.target_frame_time if self.target_frame_time else 0.0,
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "interval": {
+                "frames": self._interval_frames,
+                "dropped": self._interval_dropped,
+                "p50_ms": p50 * 1000, "p95_ms": p95 * 1000, "p99_ms": p99 * 1000,
+                "max_ms": self._interval_max * 1000,
+            },
+        }
+        if extra:
+            snapshot.update(extra)
+
+        self._buckets = array('L', [0]) * BUCKET_COUNT
+        self._interval_frames = 0
+        self._interval_dropped = 0
+        self._interval_max = 0.0
+        self._next_report = now + self.report_interval
+        self.last_report = snapshot
+
+        if self.stats_path:
+            self.write(snapshot)
+        return snapshot
+
+    def write(self, snapshot):
+        tmp_path = self.stats_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.stats_path)
+        except OSError as e:
+            print(f"\nCould not write frame stats to {self.stats_path}: {e}")
+
+
+def read_stats(stats_path):
+    """Reads the latest snapshot published by a running ticker."""
+    with open(stats_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Print the frame stats published by a running ticker.")
+    parser.add_argument("stats_path", nargs="?", default=DEFAULT_STATS_PATH)
+    args = parser.parse_args()
+    print(json.dumps(read_stats(args.stats_path), indent=2))
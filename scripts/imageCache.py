@@ -0,0 +1,221 @@
+import asyncio
+import hashlib
+import io
+import json
+import math
+import os
+from bisect import bisect_right
+from collections import OrderedDict
+
+import aiohttp
+import numpy as np
+from PIL import Image, ImageOps, ImageSequence
+
+IMAGE_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "images")
+SOURCES_INDEX = "sources.json" # URL -> digest of the bytes fetched for it
+MIN_FRAME_DURATION = 0.02 # Seconds; GIFs often declare 0 ms delays, which browsers treat as ~20 ms
+DEFAULT_FRAME_DURATION = 0.1
+
+
+def is_url(source):
+    return source.startswith(("http://", "https://"))
+
+
+class ImageFrames:
+    """
+    An image decoded and fitted to one box, ready to blit. Per frame it holds what each
+    backend needs: an RGB array (premultiplied uint16 plus inverse alpha when the frame
+    has any transparency) for the NumPy FrameBuffer, and an RGB PIL image, with alpha
+    applied against black, for a matrix canvas's SetImage. `ends` holds when each frame
+    ends, in seconds into the animation.
+    """
+    __slots__ = ("width", "height", "rgb", "premultiplied", "inverse", "images", "ends", "duration", "nbytes")
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.rgb = []
+        self.premultiplied = []
+        self.inverse = []
+        self.images = []
+        self.ends = []
+        self.duration = 0.0
+        self.nbytes = 0
+
+    @property
+    def count(self):
+        return len(self.images)
+
+    def add(self, rgba, duration):
+        pixels = np.asarray(rgba, dtype=np.uint8)
+        rgb = np.ascontiguousarray(pixels[:, :, :3])
+        alpha = pixels[:, :, 3:4]
+        if alpha.min() == 255:
+            premultiplied = inverse = None
+            self.nbytes += rgb.nbytes * 2
+        else:
+            alpha = alpha.astype(np.uint16)
+            premultiplied = rgb.astype(np.uint16) * alpha + 127
+            inverse = 255 - alpha
+            self.nbytes += rgb.nbytes * 2 + premultiplied.nbytes + inverse.nbytes
+        self.rgb.append(rgb)
+        self.premultiplied.append(premultiplied)
+        self.inverse.append(inverse)
+        flattened = Image.new("RGB", rgba.size)
+        flattened.paste(rgba, mask=rgba.getchannel("A"))
+        self.images.append(flattened)
+        self.duration += duration
+        self.ends.append(self.duration)
+
+    def extend_last(self, duration):
+        self.duration += duration
+        self.ends[-1] = self.duration
+
+    def frame_at(self, elapsed):
+        """Index of the frame showing `elapsed` seconds into the (looping) animation."""
+        if len(self.ends) < 2:
+            return 0
+        return bisect_right(self.ends, elapsed % self.duration)
+
+
+def bytes_per_frame(width, height):
+    # Worst case: rgb + PIL copy (3 B each), premultiplied (6 B) and inverse alpha (2 B)
+    return width * height * 14
+
+
+def decode(data, width, height, max_bytes):
+    """
+    Decodes every frame of an image and fits each into a width x height box (aspect kept,
+    centred, transparent margins). If all frames of an animation would take more than
+    `max_bytes`, only every n-th frame is kept, each shown for the frames it replaces, so
+    the animation keeps its speed at a lower frame rate.
+    """
+    frames = ImageFrames(width, height)
+    with Image.open(io.BytesIO(data)) as source:
+        count = getattr(source, "n_frames", 1)
+        keep_every = max(1, math.ceil(count * bytes_per_frame(width, height) / max_bytes))
+        for i, frame in enumerate(ImageSequence.Iterator(source)):
+            duration = max(MIN_FRAME_DURATION, frame.info.get("duration", DEFAULT_FRAME_DURATION * 1000) / 1000)
+            if i % keep_every:
+                frames.extend_last(duration)
+                continue
+            fitted = ImageOps.contain(frame.convert("RGBA"), (width, height), Image.Resampling.LANCZOS)
+            boxed = Image.new("RGBA", (width, height))
+            boxed.paste(fitted, ((width - fitted.width) // 2, (height - fitted.height) // 2))
+            frames.add(boxed, duration)
+    return frames
+
+
+class ImageCache:
+    """
+    Images for Image objects, prepared entirely at layout load time so the render loop never
+    fetches or decodes anything.
+
+    Every source (URL or local path) is stored once in a content-addressed disk cache,
+    cache/images/<sha256>; URLs are remembered in an index and never fetched again. Each
+    (content, box size) is decoded and resized once and kept in memory as ImageFrames, LRU
+    evicted past `max_bytes`; a single animation is held to `max_image_bytes`.
+    """
+    def __init__(self, cache_dir=IMAGE_CACHE_DIR, max_bytes=16 * 1024 * 1024, max_image_bytes=4 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_image_bytes = max_image_bytes
+        self._decoded = OrderedDict()
+        self.bytes_used = 0
+        self._index = None
+        self._fetching = {}
+
+    def _blob_path(self, digest):
+        return os.path.join(self.cache_dir, digest)
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(os.path.join(self.cache_dir, SOURCES_INDEX), "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        path = os.path.join(self.cache_dir, SOURCES_INDEX)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, path)
+
+    def _store(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def _store_file(self, path):
+        with open(path, "rb") as f:
+            return self._store(f.read())
+
+    def _read(self, digest):
+        with open(self._blob_path(digest), "rb") as f:
+            return f.read()
+
+    async def fetch(self, source):
+        """Puts the source's bytes in the disk cache (a URL only once, ever) and returns their digest."""
+        task = self._fetching.get(source)
+        if task is None:
+            task = self._fetching[source] = asyncio.ensure_future(self._fetch(source))
+            task.add_done_callback(lambda _: self._fetching.pop(source, None))
+        return await task
+
+    async def _fetch(self, source):
+        if not is_url(source):
+            return await asyncio.to_thread(self._store_file, source)
+
+        index = self._load_index()
+        digest = index.get(source)
+        if digest is not None and os.path.exists(self._blob_path(digest)):
+            return digest
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
+            async with session.get(source) as response:
+                response.raise_for_status()
+                data = await response.read()
+        digest = await asyncio.to_thread(self._store, data)
+        index[source] = digest
+        await asyncio.to_thread(self._save_index)
+        return digest
+
+    async def load(self, source, width, height):
+        """
+        Returns the ImageFrames for `source` fitted to a width x height box. Raises OSError
+        (including PIL's UnidentifiedImageError) or aiohttp.ClientError if it can't be had.
+        """
+        digest = await self.fetch(source)
+        key = (digest, width, height)
+        frames = self._decoded.get(key)
+        if frames is not None:
+            self._decoded.move_to_end(key)
+            return frames
+
+        data = await asyncio.to_thread(self._read, digest)
+        frames = await asyncio.to_thread(decode, data, width, height, self.max_image_bytes)
+        self._decoded[key] = frames
+        self.bytes_used += frames.nbytes
+        while self.bytes_used > self.max_bytes and len(self._decoded) > 1:
+            _, old = self._decoded.popitem(last=False)
+            self.bytes_used -= old.nbytes
+        return frames
+
+    async def prefetch(self, sources):
+        """Fills the disk cache for a layout's `resources` without decoding anything."""
+        for source in sources:
+            try:
+                await self.fetch(source)
+            except (OSError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"\nCould not fetch resource {source}: {e}")
+
+    def stats(self):
+        return {"images": len(self._decoded), "bytes": self.bytes_used}
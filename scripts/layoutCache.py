@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+
+from scripts import validateSchema
+
+CACHE_FORMAT = 1 # Bump when the shape of the flattened objects changes
+MAX_ENTRIES = 32 # Oldest entries beyond this are deleted
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "layouts")
+
+
+class LayoutCache:
+    """
+    On-disk cache of validated, flattened layouts, keyed by the sha256 of the layout file's
+    bytes. A hit skips json-schema validation (and importing jsonschema at all) and the
+    geometry pass of unpack_layout; only the live parts (templates, images) are rebuilt.
+
+    An entry also records the panel size and the schema file it was validated against
+    (mtime and size), so resizing the panel or editing the schema invalidates it.
+    """
+    def __init__(self, panel_width, panel_height, cache_dir=DEFAULT_CACHE_DIR, max_entries=MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.salt = f"{CACHE_FORMAT}:{panel_width}x{panel_height}"
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, digest):
+        return os.path.join(self.cache_dir, hashlib.sha256(f"{self.salt}:{digest}".encode()).hexdigest() + ".json")
+
+    @staticmethod
+    def _schema_stamp(version):
+        stat = os.stat(validateSchema.schema_path_for(version))
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def get(self, digest):
+        """Returns {'objects', 'resources'} for a layout digest, or None if not cached or stale."""
+        try:
+            with open(self._path(digest), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry.get("salt") != self.salt or entry.get("schema") != self._schema_stamp(entry["version"]):
+                entry = None
+        except (OSError, ValueError, KeyError):
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, digest, version, objects, resources=None):
+        """Stores a validated layout's flattened objects (write to a temp file, then rename)."""
+        path = self._path(digest)
+        tmp_path = path + ".tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"salt": self.salt, "version": version, "schema": self._schema_stamp(version),
+                           "objects": objects, "resources": resources}, f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+            self._prune()
+        except OSError as e:
+            print(f"Could not cache layout in {self.cache_dir}: {e}")
+
+    def _prune(self):
+        entries = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith(".json")]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=os.path.getmtime)
+        for path in entries[:len(entries) - self.max_entries]:
+            os.remove(path)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
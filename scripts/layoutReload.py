@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import json
+import os
+
+from scripts import validateSchema
+
+POLL_INTERVAL = 0.5 # Seconds between stat() checks of the layout file
+# Flat-object fields that are compiled from the others, so they play no part in the comparison
+DERIVED_FIELDS = ("template", "on_scroll_end", "image")
+# What a bad layout edit can raise while it is built: unreadable JSON or file, schema
+# violations, a font that doesn't exist or won't compile, placeholders naming unknown sources
+BUILD_ERRORS = (OSError, ValueError, KeyError, AttributeError, IndexError, validateSchema.SchemaValidationError)
+
+
+def object_signature(obj):
+    """Identifies a flat layout object by everything that affects how it is built and drawn."""
+    return json.dumps({k: v for k, v in obj.items() if k not in DERIVED_FIELDS}, sort_keys=True, default=str)
+
+
+class LayoutReloader:
+    """
+    Loads a layout file and, in watch mode, reloads it whenever its content changes.
+
+    The file is only stat()ed while idle; it is re-read and hashed when its mtime or size
+    moves, and only re-validated (with the cached per-version validator) and rebuilt when the
+    hash differs. Objects whose flattened definition is unchanged keep their existing render
+    node (resolved text, sprite, prepared headlines) and scroll position; only new or edited
+    objects get new nodes. The rebuilt node list waits in `pending` until the draw loop takes
+    it between frames.
+
+    `flatten(layout)` resolves a validated layout into flat, JSON-serializable objects
+    (flatten_layout), `bind(objects, resources)` is awaited to attach their templates and
+    images (bind_layout) and `compile_node(index, obj)` builds one node, returning None for
+    objects without a renderer. With a layoutCache.LayoutCache, a file whose content was
+    seen before skips validation and flattening.
+    """
+    def __init__(self, path, flatten, bind, compile_node, poll_interval=POLL_INTERVAL, cache=None):
+        self.path = path
+        self.flatten = flatten
+        self.bind = bind
+        self.compile_node = compile_node
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self.digest = None
+        self.reloads = 0
+        self._stat = None
+        self._entries = [] # (signature, node) for the newest layout, staged or live
+        self._live = set() # ids of the nodes the draw loop is currently using
+        self._pending = None
+
+    def _read(self):
+        stat = os.stat(self.path)
+        self._stat = (stat.st_mtime_ns, stat.st_size)
+        with open(self.path, "rb") as f:
+            data = f.read()
+        return data, hashlib.sha256(data).hexdigest()
+
+    def _flatten(self, data, digest):
+        entry = self.cache.get(digest) if self.cache is not None else None
+        if entry is not None:
+            return entry["objects"], entry["resources"]
+        layout = validateSchema.validate_layout_data(json.loads(data))
+        objects = self.flatten(layout)
+        if self.cache is not None:
+            self.cache.put(digest, layout["version"], objects, layout.get("resources"))
+        return objects, layout.get("resources")
+
+    async def _build(self, data, digest):
+        objects, resources = self._flatten(data, digest)
+        objects = await self.bind(objects, resources)
+
+        reusable = {}
+        for signature, node in self._entries:
+            reusable.setdefault(signature, []).append(node)
+
+        entries, plan, rebuilt = [], [], 0
+        for idx, obj in enumerate(objects):
+            signature = object_signature(obj)
+            matches = reusable.get(signature)
+            if matches:
+                node = matches.pop(0)
+                plan.append((idx, node, True))
+            else:
+                node = self.compile_node(idx, obj)
+                if node is None:
+                    continue
+                plan.append((idx, node, False))
+                rebuilt += 1
+                await asyncio.sleep(0) # Let frames run between objects when (pre)loading in the background
+            entries.append((signature, node))
+        return entries, plan, rebuilt
+
+    async def load(self):
+        """Loads the layout for the first time and returns its render nodes."""
+        data, self.digest = self._read()
+        self._entries, plan, _ = await self._build(data, self.digest)
+        nodes = [node for _, node, _ in plan]
+        self._live = {id(node) for node in nodes}
+        return nodes
+
+    async def check(self):
+        """Stages a rebuilt layout if the file's content changed; returns True if one was staged."""
+        try:
+            stat = os.stat(self.path)
+            if (stat.st_mtime_ns, stat.st_size) == self._stat:
+                return False
+            data, digest = self._read()
+        except OSError as e:
+            print(f"\nCould not read layout {self.path}: {e}")
+            return False
+        if digest == self.digest:
+            return False # Touched or rewritten with identical content
+
+        try:
+            entries, plan, rebuilt = await self._build(data, digest)
+        except BUILD_ERRORS as e:
+            # json.JSONDecodeError is a ValueError; keep showing the last good layout
+            print(f"\nLayout {self.path} not reloaded: {e}")
+            return False
+
+        self.digest = digest
+        self._entries = entries
+        self._pending = plan
+        print(f"\nLayout {self.path} changed: {rebuilt} object(s) rebuilt, {len(plan) - rebuilt} kept.")
+        return True
+
+    def unload(self):
+        """Drops every node, so the next load() starts from scratch."""
+        self.digest = None
+        self._stat = None
+        self._entries = []
+        self._live = set()
+        self._pending = None
+
+    @property
+    def pending(self):
+        return self._pending is not None
+
+    def take(self, scroll_state):
+        """
+        Returns (nodes, scroll_state) for the staged layout. Kept nodes carry their scroll
+        position over to their new index; call between frames.
+        """
+        plan, self._pending = self._pending, None
+        new_state = {}
+        for idx, node, kept in plan:
+            # A node kept from a staged-but-never-shown layout has no scroll position yet
+            if kept and id(node) in self._live and node.index in scroll_state:
+                new_state[idx] = scroll_state[node.index]
+            node.index = idx
+        nodes = [node for _, node, _ in plan]
+        self._live = {id(node) for node in nodes}
+        self.reloads += 1
+        return nodes, new_state
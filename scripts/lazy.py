@@ -0,0 +1,56 @@
+import importlib
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    """
+    Returns module `name`, executed only when one of its attributes is first used. Keeps
+    heavy dependencies (aiohttp, feedparser, jsonschema, PIL) off the startup path for
+    features a run never touches.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+class Deferred:
+    """
+    Stand-in for a singleton that is built by `factory()` on first attribute access, so
+    e.g. `NewsParser.next_news` in a layout only imports and constructs the parser when a
+    layout actually binds it. Attribute reads and writes go to the built object.
+    """
+    __slots__ = ("_factory", "_instance")
+
+    def __init__(self, factory):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+
+    def _get(self):
+        instance = object.__getattribute__(self, "_instance")
+        if instance is None:
+            instance = object.__getattribute__(self, "_factory")()
+            object.__setattr__(self, "_instance", instance)
+        return instance
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._get(), name, value)
+
+
+def is_built(deferred):
+    """True once a Deferred's object exists (always True for anything else)."""
+    if isinstance(deferred, Deferred):
+        return object.__getattribute__(deferred, "_instance") is not None
+    return True
@@ -0,0 +1,236 @@
+import asyncio
+import json
+import time
+
+from scripts import layoutReload
+
+DEFAULT_DURATION = 30.0 # Seconds on screen for scenes that don't give a duration
+PRELOAD_AHEAD = 10.0 # Scenes are loaded and warmed this long before their turn
+UNLOAD_AFTER = 60.0 # Loaded scenes not due again within this long are dropped
+MAINTAIN_INTERVAL = 0.5 # Seconds between preload/unload (and --watch) passes
+MAX_WARM_TRIGGERS = 4 # Triggered scenes kept loaded and ready; the least recently called up beyond this are dropped
+
+
+def load_playlist(path):
+    """
+    Reads a playlist file and returns its scenes as [(layout_path, duration, trigger)]:
+
+        {"scenes": [
+            {"layout": "./layouts/1.json", "duration": 30},
+            {"layout": "./layouts/news.json", "duration": 20},
+            {"layout": "./layouts/alert.json", "trigger": "alert", "duration": 15}
+        ]}
+
+    Scenes with a "trigger" are left out of the rotation and only shown when triggered.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    entries = []
+    for scene in data.get("scenes", []):
+        if not isinstance(scene, dict) or not scene.get("layout"):
+            raise ValueError(f"Playlist {path}: every scene needs a 'layout'")
+        duration = float(scene.get("duration", DEFAULT_DURATION))
+        if duration <= 0:
+            raise ValueError(f"Playlist {path}: scene {scene['layout']} needs a positive duration")
+        entries.append((scene["layout"], duration, scene.get("trigger")))
+
+    if not any(trigger is None for _, _, trigger in entries):
+        raise ValueError(f"Playlist {path} has no untriggered scenes to rotate through")
+    return entries
+
+
+class Scene:
+    """One playlist entry. `nodes` is None while the scene is not loaded."""
+    __slots__ = ("path", "duration", "trigger", "reloader", "nodes", "scroll_state", "task", "failed")
+
+    def __init__(self, path, duration, trigger, reloader):
+        self.path = path
+        self.duration = duration
+        self.trigger = trigger
+        self.reloader = reloader
+        self.nodes = None
+        self.scroll_state = {}
+        self.task = None
+        self.failed = False
+
+    @property
+    def loaded(self):
+        return self.nodes is not None
+
+
+class Playlist:
+    """
+    Rotates through layouts ("scenes"), each shown for its duration, with triggered scenes
+    shown on demand in between.
+
+    Each scene is validated, unpacked, compiled and warmed (fonts mapped, templates
+    compiled, current text rasterized) in the background PRELOAD_AHEAD seconds before its
+    turn, so a switch only points the draw loop at another node list. Loaded scenes whose
+    next turn is more than UNLOAD_AFTER seconds away are dropped. Triggered scenes can be
+    called up at any moment by `trigger(name)` (over HTTP: POST /scenes/<name> on the
+    alert server), so up to MAX_WARM_TRIGGERS of them (the most recently called up, at
+    first the earliest in the playlist) are kept loaded too; a switch to one of those is
+    as cheap as any other. Memory stays bounded by the scenes around the current one
+    plus those warm triggered scenes.
+
+    `make_reloader(path)` returns the layoutReload.LayoutReloader that loads a scene; with
+    `watch`, loaded scenes also pick up edits to their files.
+    """
+    def __init__(self, entries, make_reloader, watch=False, clock=time.monotonic,
+                 preload_ahead=PRELOAD_AHEAD, unload_after=UNLOAD_AFTER, max_warm_triggers=MAX_WARM_TRIGGERS):
+        self.scenes = [Scene(path, duration, trigger, make_reloader(path)) for path, duration, trigger in entries]
+        self.rotation = [scene for scene in self.scenes if scene.trigger is None]
+        self.triggers = {scene.trigger: scene for scene in self.scenes if scene.trigger is not None}
+        self.watch = watch
+        self.clock = clock
+        self.preload_ahead = preload_ahead
+        self.unload_after = unload_after
+        self.position = 0 # Rotation index of the scene on screen (or interrupted by a trigger)
+        self.current = self.rotation[0]
+        self.switch_at = 0.0
+        self.switches = 0
+        self._triggered = None
+        self.max_warm_triggers = max_warm_triggers
+        self._warm = list(self.triggers.values())[:max_warm_triggers] # Most recently triggered first
+
+    async def start(self):
+        """Loads the first scene (its errors propagate) and starts the clock."""
+        await self._load(self.current, raise_errors=True)
+        self.switch_at = self.clock() + self.current.duration
+        return self.current
+
+    def trigger(self, name):
+        """Shows the scene with this trigger from the next frame on; returns False if there is none."""
+        scene = self.triggers.get(name)
+        if scene is None:
+            return False
+        self._triggered = scene
+        if scene in self._warm:
+            self._warm.remove(scene)
+        self._warm.insert(0, scene)
+        del self._warm[self.max_warm_triggers:]
+        self._ensure_loading(scene)
+        return True
+
+    def tick(self):
+        """
+        Called once per frame. Returns True when the draw loop should pick up
+        current.nodes and current.scroll_state (a switch, or a reload of the current scene).
+        """
+        now = self.clock()
+        changed = False
+
+        target = None
+        if self._triggered is not None:
+            target = self._triggered
+        elif now >= self.switch_at:
+            target = self._next_in_rotation()
+
+        if target is not None:
+            if target.loaded:
+                self._triggered = None
+                if target is not self.current:
+                    target.scroll_state.clear() # Scrolling text enters afresh on every showing
+                    self.current = target
+                    self.switches += 1
+                    changed = True
+                if target.trigger is None:
+                    self.position = self.rotation.index(target)
+                self.switch_at = now + target.duration
+            elif target.failed:
+                # Could not be loaded: skip it this time round, the next pass will retry it
+                target.failed = False
+                if target is self._triggered:
+                    self._triggered = None
+                else:
+                    self.position = self.rotation.index(target)
+            else:
+                # Still loading: the current scene stays up until the new one is ready
+                self._ensure_loading(target)
+
+        scene = self.current
+        if scene.reloader.pending:
+            scene.nodes, scene.scroll_state = scene.reloader.take(scene.scroll_state)
+            changed = True
+        return changed
+
+    def _next_in_rotation(self):
+        if self.current.trigger is not None:
+            return self.rotation[self.position] # Resume the scene the trigger interrupted
+        return self.rotation[(self.position + 1) % len(self.rotation)]
+
+    def time_until(self, scene, now):
+        """
+        Seconds until the scene is next on screen: 0 for the current scene, one that was just
+        triggered and a triggered scene kept warm (it may be called up at any moment), never
+        (inf) for the other triggered scenes.
+        """
+        if scene is self.current or scene is self._triggered:
+            return 0.0
+        if scene.trigger is not None:
+            return 0.0 if scene in self._warm else float("inf")
+        count = len(self.rotation)
+        start = self.position if self.current.trigger is not None else self.position + 1
+        wait = max(0.0, self.switch_at - now)
+        for step in range(count):
+            candidate = self.rotation[(start + step) % count]
+            if candidate is scene:
+                return wait
+            wait += candidate.duration
+        return wait
+
+    def _ensure_loading(self, scene):
+        if scene.task is None and not scene.loaded:
+            scene.failed = False
+            scene.task = asyncio.create_task(self._load(scene))
+
+    async def _load(self, scene, raise_errors=False):
+        try:
+            nodes = await scene.reloader.load()
+        except layoutReload.BUILD_ERRORS as e:
+            if raise_errors:
+                raise
+            print(f"\nScene {scene.path} not loaded: {e}")
+            scene.failed = True
+        else:
+            scene.nodes = nodes
+            scene.scroll_state = {}
+        finally:
+            scene.task = None
+
+    def _unload(self, scene):
+        scene.nodes = None
+        scene.scroll_state = {}
+        scene.reloader.unload()
+
+    def stats(self):
+        return {
+            "scene": self.current.path,
+            "switches": self.switches,
+            "loaded": sum(1 for scene in self.scenes if scene.loaded),
+        }
+
+    async def run(self, interval=MAINTAIN_INTERVAL):
+        """Preloads scenes coming up, unloads those far off and, with `watch`, reloads edited ones."""
+        while True:
+            now = self.clock()
+            for scene in self.scenes:
+                try:
+                    await self._maintain(scene, now)
+                except Exception as e:
+                    # One scene's trouble must not stop rotation, preloading or reloads for the rest
+                    print(f"\nScene {scene.path} maintenance failed: {e!r}")
+                    scene.failed = True
+            await asyncio.sleep(interval)
+
+    async def _maintain(self, scene, now):
+        until = self.time_until(scene, now)
+        if until <= self.preload_ahead:
+            if scene.loaded:
+                if self.watch:
+                    await scene.reloader.check()
+            elif not scene.failed:
+                self._ensure_loading(scene)
+        elif until > self.unload_after and scene.loaded and scene.task is None:
+            self._unload(scene)
@@ -0,0 +1,74 @@
+import asyncio
+
+from scripts import templates
+
+LOOKAHEAD_DEPTH = 3 # Upcoming values prepared per source
+PREFETCH_INTERVAL = 0.25 # Seconds between checks for a changed lookahead
+
+
+class LookaheadPrefetcher:
+    """
+    Prepares the next few values of a rotating source (e.g. news headlines) before they
+    are shown. For every render node bound to `source_func`, each upcoming value's text is
+    rasterized (on a worker thread) and measured in advance and stored in node.prepared,
+    so the frame after onScrollEnd only swaps in a ready sprite and width.
+
+    `lookahead(count)` must return the source's next `count` values in display order.
+    Whenever that list changes (the index moved, or a refreshed list is pending) entries
+    that are no longer upcoming are dropped and the new ones prepared.
+    """
+    def __init__(self, nodes, scheduler, source_func, lookahead, sprites, depth=LOOKAHEAD_DEPTH):
+        self.scheduler = scheduler
+        self.lookahead = lookahead
+        self.sprites = sprites
+        self.source_func = source_func
+        self.depth = depth
+        self.targets = []
+        self._upcoming = None
+        self.prepared = 0
+        self.set_nodes(nodes)
+
+    def set_nodes(self, nodes):
+        """Re-targets the prefetcher (e.g. after a layout reload); kept nodes keep what they have."""
+        self.targets = [(node, binding) for node in nodes
+                        for binding in self._bindings_for(node.template, self.source_func)]
+        self._upcoming = None
+
+    def _bindings_for(self, template, source_func):
+        if template is None:
+            return
+        for binding in template.bindings:
+            if isinstance(binding, templates.SnapshotBinding):
+                source = self.scheduler.source(binding.key)
+                if source is not None and source.func == source_func:
+                    yield binding
+
+    async def step(self):
+        upcoming = self.lookahead(self.depth)
+        if upcoming == self._upcoming:
+            return
+        self._upcoming = upcoming
+
+        for node, binding in self.targets:
+            texts = [node.template.preview(binding, value) for value in upcoming]
+            # Built aside and swapped in whole, so the render loop never sees it half-filled
+            previous = node.prepared or {}
+            prepared = {text: previous[text] for text in texts if text in previous}
+            for text in texts:
+                if text not in prepared:
+                    # Rasterized on a worker thread, so preparing never holds up a frame
+                    prepared[text] = await node.prepare_async(text, self.sprites)
+                    self.prepared += 1
+                    if self.lookahead(self.depth) != upcoming:
+                        self._upcoming = None # moved on meanwhile; start over on the next step
+                        return
+            node.prepared = prepared
+
+    async def run(self, interval=PREFETCH_INTERVAL):
+        while True:
+            try:
+                if self.targets:
+                    await self.step()
+            except Exception as e:
+                print(f"\nHeadline prefetch failed: {e}")
+            await asyncio.sleep(interval)
@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import deque
+
+
+class Presenter:
+    """
+    Runs matrix.SwapOnVSync on a dedicated thread so the event loop never blocks on vsync.
+
+    Canvases come from a small pool. The draw loop fills one, hands it over with `swap`
+    (same contract as SwapOnVSync: it returns the canvas to draw the next frame into) and
+    carries on while the presenter thread waits for vsync. At most `queue_size` finished
+    frames wait to be shown; when the loop gets ahead, the oldest waiting frame is dropped
+    and its canvas reused, so the panel always shows the newest frame.
+
+    Counters: `presented`, `dropped` (replaced before reaching vsync) and `missed_vsyncs`
+    (refresh periods that passed with no new frame ready).
+    """
+    def __init__(self, matrix, frame_time, pool_size=3, queue_size=1):
+        self.matrix = matrix
+        self.frame_time = frame_time
+        self.queue_size = queue_size
+        self._free = deque(matrix.CreateFrameCanvas() for _ in range(pool_size))
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self.error = None
+
+        self.presented = 0
+        self.dropped = 0
+        self.missed_vsyncs = 0
+        self.swap_time = 0.0
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="presenter", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def acquire(self):
+        """Returns a canvas that is safe to draw into (not queued, swapping or on screen)."""
+        with self._cond:
+            while not self._free:
+                if self._queue:
+                    # Reuse the oldest frame still waiting for vsync; a newer one replaces it
+                    self.dropped += 1
+                    return self._queue.popleft()
+                self._raise_error()
+                self._cond.wait(self.frame_time)
+            return self._free.popleft()
+
+    def submit(self, canvas):
+        """Queues a finished frame for the next vsync, dropping the oldest if the queue is full."""
+        with self._cond:
+            self._raise_error()
+            if len(self._queue) >= self.queue_size:
+                self._free.append(self._queue.popleft())
+                self.dropped += 1
+            self._queue.append(canvas)
+            self._cond.notify()
+
+    def set_frame_time(self, frame_time):
+        """Follows the draw loop's frame rate, so waits and missed_vsyncs use the current period."""
+        self.frame_time = frame_time
+
+    def swap(self, canvas):
+        self.submit(canvas)
+        return self.acquire()
+
+    def stats(self):
+        return {
+            "presented": self.presented,
+            "dropped": self.dropped,
+            "missed_vsyncs": self.missed_vsyncs,
+            "avg_swap_ms": self.swap_time / self.presented * 1000 if self.presented else 0.0,
+        }
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise RuntimeError("Presenter thread failed") from self.error
+
+    def _run(self):
+        last_swap = None
+        try:
+            while True:
+                with self._cond:
+                    while self._running and not self._queue:
+                        self._cond.wait()
+                    if not self._running:
+                        return
+                    canvas = self._queue.popleft()
+
+                start = time.perf_counter()
+                # The real library hands back the previous front buffer; the emulator hands
+                # back the canvas it was given. Either way it is free to draw into again.
+                released = self.matrix.SwapOnVSync(canvas)
+                end = time.perf_counter()
+
+                if last_swap is not None:
+                    periods = int((end - last_swap) / self.frame_time + 0.5)
+                    if periods > 1:
+                        self.missed_vsyncs += periods - 1
+                last_swap = end
+                self.swap_time += end - start
+                self.presented += 1
+
+                with self._cond:
+                    self._free.append(released)
+                    self._cond.notify_all()
+        except BaseException as e:
+            # Surfaced to the draw loop on its next submit/acquire
+            with self._cond:
+                self.error = e
+                self._cond.notify_all()
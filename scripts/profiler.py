@@ -0,0 +1,191 @@
+import time
+
+FRAME_SCOPE = "frame"
+
+
+class Profiler:
+    """
+    Opt-in render profiler (`--profile`). Nothing here runs unless a Profiler is created:
+    it works by wrapping the callables the renderer already uses (node render functions,
+    templates, fonts, the sprite cache, blit, gradient, composite and swap), so the
+    unprofiled path keeps calling the originals directly.
+
+    Timings are aggregated per (scope, stage) as [calls, total_ns, max_ns], where scope is
+    "frame" or a layout object's "<index>:<type>" (index as in scroll_state).
+    """
+    def __init__(self, clock=time.perf_counter_ns):
+        self.clock = clock
+        self.frames = 0
+        self.current = FRAME_SCOPE
+        self._totals = {}
+
+    def add(self, scope, stage, elapsed):
+        entry = self._totals.get((scope, stage))
+        if entry is None:
+            self._totals[(scope, stage)] = [1, elapsed, elapsed]
+            return
+        entry[0] += 1
+        entry[1] += elapsed
+        if elapsed > entry[2]:
+            entry[2] = elapsed
+
+    def timed(self, stage, func, scope=None, counts_frame=False):
+        """Wraps func so each call is added to `stage` of `scope` (default: the object being drawn)."""
+        clock = self.clock
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(scope or self.current, stage, clock() - start)
+                if counts_frame:
+                    self.frames += 1
+        return wrapper
+
+    # --- Instrumentation ---
+
+    def instrument(self, nodes):
+        """Wraps each render node in place so its stages are attributed to it (once; reloads keep nodes)."""
+        for node in nodes:
+            if getattr(node.render, "profiled", False):
+                continue
+            scope = f"{node.index}:{node.type}"
+            node.render = self._timed_render(scope, node.render)
+            if node.template is not None: # Image nodes have no text
+                node.template = TimedTemplate(node.template, self)
+                node.font = TimedFont(node.font, self)
+        return nodes
+
+    def _timed_render(self, scope, render):
+        clock = self.clock
+
+        def wrapper(node, ctx):
+            previous, self.current = self.current, scope
+            start = clock()
+            try:
+                render(node, ctx)
+            finally:
+                self.add(scope, "total", clock() - start)
+                self.current = previous
+        wrapper.profiled = True
+        return wrapper
+
+    def instrument_context(self, ctx):
+        """Times sprite lookups/rasterization and blits for one frame's RenderContext."""
+        ctx.sprites = TimedSprites(ctx.sprites, self)
+        ctx.blit = self.timed("blit", ctx.blit)
+        if ctx.blit_over is not None:
+            ctx.blit_over = self.timed("blit", ctx.blit_over)
+        return ctx
+
+    # --- Reporting ---
+
+    def rows(self):
+        """(scope, stage, calls, total_ns, max_ns) ranked by total time, with each object's
+        untimed remainder (positioning, scrolling, layer registration) reported as "self"."""
+        rows = []
+        children = {}
+        for (scope, stage), (calls, total, peak) in self._totals.items():
+            if stage != "total":
+                rows.append((scope, stage, calls, total, peak))
+                children[scope] = children.get(scope, 0) + total
+        for (scope, stage), (calls, total, peak) in self._totals.items():
+            if stage == "total":
+                rows.append((scope, "self", calls, max(0, total - children.get(scope, 0)), peak))
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows
+
+    def report(self):
+        rows = self.rows()
+        frames = self.frames or 1
+        profiled = sum(row[3] for row in rows) or 1
+
+        lines = [f"Render profile over {self.frames} frames",
+                 f"{'scope':<24} {'stage':<10} {'total ms':>10} {'share':>7} {'us/frame':>10} {'calls':>9} {'mean us':>9} {'max us':>9}"]
+        for scope, stage, calls, total, peak in rows:
+            lines.append(f"{scope:<24} {stage:<10} {total / 1e6:10.1f} {total / profiled:7.1%} "
+                         f"{total / frames / 1e3:10.1f} {calls:9d} {total / calls / 1e3:9.1f} {peak / 1e3:9.1f}")
+
+        objects = {}
+        for scope, stage, calls, total, peak in rows:
+            if scope != FRAME_SCOPE:
+                objects[scope] = objects.get(scope, 0) + total
+        if objects:
+            lines.append("")
+            lines.append("Objects by total time:")
+            for scope, total in sorted(objects.items(), key=lambda item: item[1], reverse=True):
+                lines.append(f"  {scope:<22} {total / frames / 1e3:10.1f} us/frame")
+        return "\n".join(lines)
+
+    def write_collapsed(self, path):
+        """Writes folded stacks (`frame;layout;3:Textbox;raster <us>`) for flamegraph tools."""
+        with open(path, "w", encoding="utf-8") as f:
+            for scope, stage, calls, total, peak in self.rows():
+                if scope == FRAME_SCOPE:
+                    stack = f"{FRAME_SCOPE};{stage}"
+                elif stage == "self":
+                    stack = f"{FRAME_SCOPE};layout;{scope}"
+                else:
+                    stack = f"{FRAME_SCOPE};layout;{scope};{stage}"
+                f.write(f"{stack} {total // 1000}\n")
+
+
+class TimedTemplate:
+    """Stands in for a CompiledTemplate, timing resolve() as the "resolve" stage."""
+    __slots__ = ("_template", "_profiler")
+
+    def __init__(self, template, profiler):
+        self._template = template
+        self._profiler = profiler
+
+    def resolve(self, now=None):
+        profiler = self._profiler
+        start = profiler.clock()
+        try:
+            return self._template.resolve(now)
+        finally:
+            profiler.add(profiler.current, "resolve", profiler.clock() - start)
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+
+class TimedFont:
+    """Stands in for a GlyphAtlas, timing text_width() as the "measure" stage."""
+    __slots__ = ("_font", "_profiler")
+
+    def __init__(self, font, profiler):
+        self._font = font
+        self._profiler = profiler
+
+    def text_width(self, text):
+        profiler = self._profiler
+        start = profiler.clock()
+        try:
+            return self._font.text_width(text)
+        finally:
+            profiler.add(profiler.current, "measure", profiler.clock() - start)
+
+    def __getattr__(self, name):
+        return getattr(self._font, name)
+
+
+class TimedSprites:
+    """Stands in for a SpriteCache, timing get() (lookup plus rasterization on a miss) as "raster"."""
+    __slots__ = ("_sprites", "_profiler")
+
+    def __init__(self, sprites, profiler):
+        self._sprites = sprites
+        self._profiler = profiler
+
+    def get(self, font, text, default_color):
+        profiler = self._profiler
+        start = profiler.clock()
+        try:
+            return self._sprites.get(font, text, default_color)
+        finally:
+            profiler.add(profiler.current, "raster", profiler.clock() - start)
+
+    def __getattr__(self, name):
+        return getattr(self._sprites, name)
@@ -0,0 +1,295 @@
+from scripts import dirtyRegions, lazy
+
+Image = lazy.lazy_import("PIL.Image") # Only box fills on the canvas backend need it
+
+SCROLL_PIXELS_PER_SECOND = 30 # Per unit of a ScrollingTextbox's scrollSpeed
+MAX_SCROLL_CATCHUP = 0.25 # Seconds; after a longer stall the next pass starts afresh instead of part-way through
+DEFAULT_FONT = "4x6.bdf" # For text objects that don't name one
+
+
+def parse_rgba(hex_str):
+    """'#RRGGBB' or '#RRGGBBAA' -> (r, g, b, a), alpha 0-255 (opaque when not given)."""
+    r, g, b = int(hex_str[1:3], 16), int(hex_str[3:5], 16), int(hex_str[5:7], 16)
+    a = int(hex_str[7:9], 16) if len(hex_str) == 9 else 255
+    return r, g, b, a
+
+
+class RenderContext:
+    """
+    Per-frame state shared by every node's render function. `now` is the frame's monotonic
+    time and `dt` the measured interval since the previous frame.
+    """
+    __slots__ = ("canvas", "regions", "sprites", "scroll_state", "now", "dt", "blit", "blit_over", "fill", "image")
+
+    def __init__(self, canvas, regions, sprites, scroll_state, now, dt):
+        self.canvas = canvas
+        self.regions = regions
+        self.sprites = sprites
+        self.scroll_state = scroll_state
+        self.now = now
+        self.dt = dt
+        # NumPy framebuffers blit whole sprites at once; matrix canvases go pixel by pixel,
+        # unless the text sits on an opaque background (then it is one SetImage)
+        blit_sprite = getattr(canvas, "blit_sprite", None)
+        self.blit = blit_sprite if blit_sprite is not None else canvas_blit(canvas)
+        self.blit_over = None if blit_sprite is not None else canvas_blit_over(canvas)
+        blend_rect = getattr(canvas, "blend_rect", None)
+        self.fill = blend_rect if blend_rect is not None else canvas_fill(canvas)
+        blit_image = getattr(canvas, "blit_image", None)
+        self.image = blit_image if blit_image is not None else canvas_image(canvas)
+
+
+def canvas_blit(canvas):
+    def blit(sprite, x, y, alpha=255, clip=None):
+        sprite.blit(canvas, x, y, alpha, clip)
+    return blit
+
+
+def canvas_blit_over(canvas):
+    """
+    Sprite blits over an opaque background for matrix canvases: the visible part of the
+    sprite's image on that background (TextSprite.over) is cropped and sent with one
+    SetImage. Text over a transparent box still needs a SetPixel per lit pixel, as a
+    canvas can't be read back to blend with.
+    """
+    def blit(sprite, x, y, background, alpha=255, clip=None):
+        rect = sprite.rect_at(x, y)
+        if rect is None:
+            return
+        x0, y0 = max(0, rect[0]), max(0, rect[1])
+        x1, y1 = min(canvas.width, rect[2]), min(canvas.height, rect[3])
+        if clip is not None:
+            x0, y0, x1, y1 = max(x0, clip[0]), max(y0, clip[1]), min(x1, clip[2]), min(y1, clip[3])
+        if x0 >= x1 or y0 >= y1:
+            return
+        left, top = rect[0], rect[1]
+        image = sprite.over(background, alpha)
+        canvas.SetImage(image.crop((x0 - left, y0 - top, x1 - left, y1 - top)), x0, y0)
+    return blit
+
+
+_SOLID_IMAGES = {}
+
+def canvas_fill(canvas):
+    """
+    Box fills for matrix canvases: one SetImage of a cached solid image rather than a
+    SetPixel per pixel. Canvases can't be read back, so alpha is applied against black.
+    """
+    def fill(x, y, w, h, r, g, b, a):
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(canvas.width, x + w), min(canvas.height, y + h)
+        if a <= 0 or x0 >= x1 or y0 >= y1:
+            return
+        color = (r * a // 255, g * a // 255, b * a // 255)
+        key = (x1 - x0, y1 - y0, color)
+        image = _SOLID_IMAGES.get(key)
+        if image is None:
+            image = _SOLID_IMAGES[key] = Image.new("RGB", key[:2], color)
+        canvas.SetImage(image, x0, y0)
+    return fill
+
+
+def canvas_image(canvas):
+    def image(frames, index, x, y, clip=None):
+        # Fitted to the node's box at load time, so it never reaches past the clip
+        canvas.SetImage(frames.images[index], x, y)
+    return image
+
+
+class TextNode:
+    """
+    A Textbox, ScrollingTextbox or Alert with everything that does not change per frame
+    resolved at compile time: absolute box, glyph atlas, colour and alpha, background,
+    baseline and the render function for its type. Text-dependent values (sprite, width,
+    alignment offset) are only recomputed when the template's text actually changes.
+    """
+    __slots__ = ("index", "type", "x", "y", "width", "height", "box", "font", "color", "alpha", "background",
+                 "baseline", "text_align", "scroll_speed", "template", "on_scroll_end", "render",
+                 "text", "sprite", "text_width", "x_offset", "prepared")
+
+    def __init__(self, index, obj, font, color, render):
+        self.index = index
+        self.type = obj["type"]
+        self.x, self.y = obj["x"], obj["y"]
+        self.width, self.height = obj["width"], obj["height"]
+        self.box = (self.x, self.y, self.x + self.width, self.y + self.height)
+        self.font = font
+        self.color = color
+        self.alpha = parse_rgba(obj["fgColor"])[3] if obj.get("fgColor") else 255
+        background = parse_rgba(obj["bgColor"]) if obj.get("bgColor") else None
+        self.background = background if background is not None and background[3] > 0 else None # (r, g, b, a)
+        self.baseline = self.y + ((self.height + font.height) // 2 - 1)
+        self.text_align = obj.get("text_align") or "left"
+        self.scroll_speed = (obj.get("scrollSpeed") or 1) * SCROLL_PIXELS_PER_SECOND # px/s
+        self.template = obj["template"]
+        self.on_scroll_end = obj["on_scroll_end"]
+        self.render = render
+        self.text = None
+        self.sprite = None
+        self.text_width = 0
+        self.x_offset = 0
+        self.prepared = None # text -> (sprite, text_width), filled ahead of time by scripts/prefetch.py
+
+    def prepare(self, text, sprites):
+        return sprites.get(self.font, text, self.color), self.font.text_width(text)
+
+    async def prepare_async(self, text, sprites):
+        """prepare() for use ahead of time: the text is rasterized off the event loop."""
+        return await sprites.get_async(self.font, text, self.color), self.font.text_width(text)
+
+    def update_text(self, sprites):
+        text = self.template.resolve()
+        if text is self.text:
+            return
+        self.text = text
+        prepared = self.prepared.get(text) if self.prepared else None
+        if prepared is not None:
+            self.sprite, self.text_width = prepared
+        else:
+            # Measured like CharacterWidth did: tags count, missing glyphs don't
+            self.sprite, self.text_width = self.prepare(text, sprites)
+        if self.text_align == "center":
+            self.x_offset = (self.width - self.text_width) // 2
+        elif self.text_align == "right":
+            self.x_offset = self.width - self.text_width
+        else:
+            self.x_offset = 0
+
+
+def draw_sprite(ctx, node, x, y):
+    """
+    Draws the node's background and sprite now, or registers them as the node's layer when
+    redrawing incrementally. Layers are composited in node order, blending by their alpha,
+    and clipped to the node's box so scrolling text never bleeds into its neighbours.
+    """
+    sprite = node.sprite
+    background = node.background
+    if ctx.regions is None:
+        if background is not None:
+            ctx.fill(node.x, node.y, node.width, node.height, *background)
+            if background[3] == 255 and ctx.blit_over is not None:
+                ctx.blit_over(sprite, x, y, background, node.alpha, node.box)
+                return
+        ctx.blit(sprite, x, y, node.alpha, node.box)
+    else:
+        # The background is a layer of its own: it never changes, so moving text only
+        # damages the sprite's rects and the box is re-blended just there.
+        if background is not None:
+            ctx.regions.layer((node.index, "bg"), background, node.box, paint_background, node)
+        rect = sprite.rect_at(x, y)
+        if rect is not None:
+            rect = dirtyRegions.intersection(rect, node.box)
+        ctx.regions.layer(node.index, (sprite, x, y), rect, paint_sprite, sprite, x, y, node.alpha, node.box)
+
+
+def paint_background(frame, node):
+    frame.blend_rect(node.x, node.y, node.width, node.height, *node.background)
+
+
+def paint_sprite(frame, sprite, x, y, alpha, box):
+    frame.blit_sprite(sprite, x, y, alpha, box)
+
+
+def render_text(node, ctx):
+    node.update_text(ctx.sprites)
+    draw_sprite(ctx, node, node.x + node.x_offset, node.baseline)
+
+
+def render_scrolling_text(node, ctx):
+    """
+    scroll_state holds the time the current pass entered from the right edge; the position
+    follows from the frame's own time, so a late frame jumps ahead rather than slowing down.
+    """
+    node.update_text(ctx.sprites)
+    scroll_state = ctx.scroll_state
+    idx = node.index
+    now = ctx.now
+    started = scroll_state.get(idx)
+    if started is None:
+        started = scroll_state[idx] = now
+
+    pos_local = node.width - node.scroll_speed * (now - started)
+    draw_sprite(ctx, node, int(node.x + pos_local), node.baseline)
+
+    if (pos_local + node.text_width) < 0:
+        # The next pass starts when this one actually left the box, not at this frame
+        ended = started + (node.width + node.text_width) / node.scroll_speed
+        scroll_state[idx] = max(ended, now - MAX_SCROLL_CATCHUP)
+        node.on_scroll_end.run()
+
+
+class ImageNode:
+    """
+    An Image object. Its picture was fetched, decoded and fitted to the box when the
+    layout was loaded (scripts/imageCache.py); per frame only the animation frame moves.
+    """
+    __slots__ = ("index", "type", "x", "y", "width", "height", "box", "image", "template", "elapsed", "render")
+
+    def __init__(self, index, obj, image, render):
+        self.index = index
+        self.type = obj["type"]
+        self.x, self.y = obj["x"], obj["y"]
+        self.width, self.height = obj["width"], obj["height"]
+        self.box = (self.x, self.y, self.x + self.width, self.y + self.height)
+        self.image = image
+        self.template = None # No text to resolve or prefetch
+        self.elapsed = 0.0
+        self.render = render
+
+
+def render_image(node, ctx):
+    image = node.image
+    frame = 0
+    if image.count > 1:
+        node.elapsed += ctx.dt
+        frame = image.frame_at(node.elapsed)
+    if ctx.regions is None:
+        ctx.image(image, frame, node.x, node.y, node.box)
+    else:
+        ctx.regions.layer(node.index, frame, node.box, paint_image, image, frame, node.x, node.y, node.box)
+
+
+def paint_image(frame, image, index, x, y, box):
+    frame.blit_image(image, index, x, y, box)
+
+
+RENDERERS = {
+    "Textbox": render_text,
+    "Alert": render_text,
+    "ScrollingTextbox": render_scrolling_text,
+    "Image": render_image,
+}
+
+
+def font_of(obj):
+    """The font a flat object's node draws its text with, or None if it has no text node."""
+    render = RENDERERS.get(obj["type"])
+    if render is None or render is render_image:
+        return None
+    return obj.get("font") or DEFAULT_FONT
+
+
+def compile_node(index, obj, load_font, parse_color):
+    """Builds the render node for one of unpack_layout's flat dicts, or None if its type has no renderer yet."""
+    render = RENDERERS.get(obj["type"])
+    if render is None:
+        return None
+    if render is render_image:
+        # No picture if it couldn't be loaded (already reported by unpack_layout)
+        return ImageNode(index, obj, obj["image"], render) if obj.get("image") is not None else None
+    font = load_font(font_of(obj))
+    color = parse_color(obj.get("fgColor") or "#FFFFFF")
+    return TextNode(index, obj, font, color, render)
+
+
+def compile_nodes(objects, load_font, parse_color):
+    """
+    Turns unpack_layout's flat dicts into render nodes. Indices match the flat list
+    (and so scroll_state); objects with no renderer yet produce no node.
+    """
+    nodes = []
+    for idx, obj in enumerate(objects):
+        node = compile_node(idx, obj, load_font, parse_color)
+        if node is not None:
+            nodes.append(node)
+    return nodes
@@ -0,0 +1,256 @@
+import asyncio
+import re
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+# Inline colour tags: [fg:#RRGGBB], [bg:#RRGGBB], or "none" for the default
+TAG_PATTERN = re.compile(r'(\[(?:fg|bg):(?:#[0-9a-fA-F]{6}|none)\])')
+TAG_MATCH = re.compile(r'\[(fg|bg):(.*)\]')
+
+# Rough per-sprite bookkeeping cost (object, arrays, key) on top of the pixel data.
+SPRITE_OVERHEAD_BYTES = 256
+# x/y/colour arrays (5 bytes) plus the int32 coordinate copies the NumPy backend makes (8 bytes).
+BYTES_PER_PIXEL = 13
+
+
+class TextSprite:
+    """
+    A tagged string rasterized once into a compact list of lit pixels.
+    Coordinates are relative to the draw origin (x, baseline y) and sorted by x,
+    so a blit only has to walk the columns that are actually on screen.
+    """
+    __slots__ = ("xs", "ys", "colors", "palette", "width", "top", "bottom", "nbytes", "_arrays", "_over")
+
+    def __init__(self, pixels, palette, width):
+        ordered = sorted(pixels.items())
+        self.xs = array('h', (p[0][0] for p in ordered))
+        self.ys = array('h', (p[0][1] for p in ordered))
+        self.colors = array('B', (p[1] for p in ordered))
+        self.palette = palette
+        self.width = width
+        self.top = min(self.ys) if self.ys else 0
+        self.bottom = max(self.ys) + 1 if self.ys else 0
+        self.nbytes = len(ordered) * BYTES_PER_PIXEL + len(palette) * 24 + SPRITE_OVERHEAD_BYTES
+        self._arrays = None
+        self._over = None
+
+    @property
+    def left(self):
+        return self.xs[0] if self.xs else 0
+
+    @property
+    def right(self):
+        return self.xs[-1] + 1 if self.xs else 0
+
+    def rect_at(self, x, y):
+        """Bounding (x0, y0, x1, y1) rect of the lit pixels when drawn at (x, y), or None if blank."""
+        if not self.xs:
+            return None
+        return (x + self.xs[0], y + self.top, x + self.xs[-1] + 1, y + self.bottom)
+
+    def visible_range(self, x, canvas_width):
+        """Index range of the pixels that land in columns 0..canvas_width-1 when drawn at x."""
+        return bisect_left(self.xs, -x), bisect_left(self.xs, canvas_width - x)
+
+    def arrays(self):
+        """NumPy copies of the pixel data (plus an (n, 3) palette), built on first use, for vectorized blits."""
+        if self._arrays is None:
+            import numpy as np
+            self._arrays = (
+                np.frombuffer(self.xs, dtype=np.int16).astype(np.int32),
+                np.frombuffer(self.ys, dtype=np.int16).astype(np.int32),
+                np.frombuffer(self.colors, dtype=np.uint8),
+                np.array(self.palette or [(0, 0, 0)], dtype=np.uint8)
+            )
+        return self._arrays
+
+    def over(self, background, alpha=255):
+        """
+        The sprite drawn onto an opaque `background` (r, g, b) as one RGB image covering its
+        lit pixels' bounding rect, for canvases that take whole images (SetImage). Built on
+        first use; only the image for the latest background and alpha is kept.
+        """
+        key = (background[:3], alpha)
+        if self._over is None or self._over[0] != key:
+            import numpy as np
+            from PIL import Image
+            xs, ys, colors, palette = self.arrays()
+            pixels = np.empty((self.bottom - self.top, self.right - self.left, 3), dtype=np.uint8)
+            pixels[:] = background[:3]
+            if alpha < 255:
+                palette = (palette.astype(np.uint16) * alpha // 255).astype(np.uint8)
+            pixels[ys - self.top, xs - self.left] = palette[colors]
+            self._over = (key, Image.fromarray(pixels, "RGB"))
+        return self._over[1]
+
+    def blit(self, canvas, x, y, alpha=255, clip=None):
+        """
+        Draws the sprite with its origin at (x, y), skipping columns outside the canvas or
+        the `clip` rect; rows are only checked when the glyphs cross its top or bottom.
+        Matrix canvases can't be read back, so alpha is applied against black.
+        """
+        xs, ys, colors, palette = self.xs, self.ys, self.colors, self.palette
+        if alpha <= 0:
+            return
+        if alpha < 255:
+            palette = [(r * alpha // 255, g * alpha // 255, b * alpha // 255) for r, g, b in palette]
+        x0, y0, x1, y1 = 0, 0, canvas.width, canvas.height
+        if clip is not None:
+            x0, y0, x1, y1 = max(x0, clip[0]), max(y0, clip[1]), min(x1, clip[2]), min(y1, clip[3])
+        lo, hi = self.visible_range(x - x0, x1 - x0)
+        set_pixel = canvas.SetPixel
+        if y0 <= y + self.top and y + self.bottom <= y1:
+            for i in range(lo, hi):
+                r, g, b = palette[colors[i]]
+                set_pixel(x + xs[i], y + ys[i], r, g, b)
+            return
+        for i in range(lo, hi):
+            py = y + ys[i]
+            if y0 <= py < y1:
+                r, g, b = palette[colors[i]]
+                set_pixel(x + xs[i], py, r, g, b)
+
+
+class SpriteCache:
+    """
+    LRU cache of rasterized text sprites keyed by (font, tagged text, default colour),
+    bounded by an approximate memory cap in bytes.
+    """
+    def __init__(self, max_bytes=4 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._sprites = OrderedDict()
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            "entries": len(self._sprites), "bytes": self.bytes_used,
+            "hits": self.hits, "misses": self.misses,
+            "evictions": self.evictions, "hit_rate": self.hit_rate
+        }
+
+    def clear(self):
+        self._sprites.clear()
+        self.bytes_used = 0
+
+    @staticmethod
+    def _key(font, text, default_color):
+        return (font.path, text, default_color.red, default_color.green, default_color.blue)
+
+    def get(self, font, text, default_color):
+        """`font` is a fontAtlas.GlyphAtlas."""
+        sprite = self.peek(font, text, default_color)
+        if sprite is not None:
+            self.hits += 1
+            return sprite
+        return self.add(font, text, default_color, self._rasterize(font, text, default_color))
+
+    def peek(self, font, text, default_color):
+        """The cached sprite (marked as recently used), or None; not counted as a hit or miss."""
+        key = self._key(font, text, default_color)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+        return sprite
+
+    async def get_async(self, font, text, default_color):
+        """
+        get() with a miss rasterized on a worker thread, so preparing text ahead of time
+        doesn't hold the event loop. The cache itself is only touched from the loop.
+        """
+        sprite = self.peek(font, text, default_color)
+        if sprite is not None:
+            self.hits += 1
+            return sprite
+        sprite = await asyncio.to_thread(self._rasterize, font, text, default_color)
+        # Another caller may have cached it meanwhile
+        return self.peek(font, text, default_color) or self.add(font, text, default_color, sprite)
+
+    def add(self, font, text, default_color, sprite):
+        """Caches a freshly rasterized sprite (counted as a miss), evicting down to the cap."""
+        self.misses += 1
+        self._sprites[self._key(font, text, default_color)] = sprite
+        self.bytes_used += sprite.nbytes
+        while self.bytes_used > self.max_bytes and len(self._sprites) > 1:
+            _, old = self._sprites.popitem(last=False)
+            self.bytes_used -= old.nbytes
+            self.evictions += 1
+        return sprite
+
+    def draw(self, canvas, font, x, y, default_color, text):
+        """Draws tagged text at (x, baseline y); returns the total visual width of the text."""
+        sprite = self.get(font, text, default_color)
+        blit_sprite = getattr(canvas, "blit_sprite", None)
+        if blit_sprite is not None:
+            blit_sprite(sprite, int(x), int(y))
+        else:
+            sprite.blit(canvas, int(x), int(y))
+        return sprite.width
+
+    @staticmethod
+    def _rasterize(font, text, default_color):
+        """
+        Lays glyphs out as DrawText does (scripts/fontParity.py checks it). A [bg:...] run
+        paints a box one pixel wider than the text on each side (plus one extra on the
+        right) before the glyphs go on top.
+        """
+        font_height = font.height
+        font_y_offset = -font.baseline
+
+        default_rgb = (default_color.red, default_color.green, default_color.blue)
+        palette = []
+        palette_index = {}
+
+        def colour_index(rgb):
+            idx = palette_index.get(rgb)
+            if idx is None:
+                idx = palette_index[rgb] = len(palette)
+                palette.append(rgb)
+            return idx
+
+        def hex_to_rgb(hex_str):
+            if not hex_str or hex_str == "none": return default_rgb
+            return (int(hex_str[1:3], 16), int(hex_str[3:5], 16), int(hex_str[5:7], 16))
+
+        pixels = {}
+        current_x = 0
+        curr_fg = default_rgb
+        curr_bg = None
+
+        for part in TAG_PATTERN.split(text):
+            if not part:
+                continue
+
+            tag_match = TAG_MATCH.match(part)
+            if tag_match:
+                tag_type, val = tag_match.groups()
+                if tag_type == "fg":
+                    curr_fg = hex_to_rgb(val)
+                elif tag_type == "bg":
+                    curr_bg = hex_to_rgb(val)
+                continue
+
+            width = font.advance_width(part)
+
+            if curr_bg:
+                bg = colour_index(curr_bg)
+                for bg_y in range(font_height + 2):
+                    row = 1 - bg_y
+                    for bx in range(current_x - 1, current_x + width + 3):
+                        pixels[(bx, row)] = bg
+
+            fg = colour_index(curr_fg)
+            for x2, y2 in font.run_pixels(part):
+                pixels[(current_x + x2, y2 + font_y_offset)] = fg
+
+            current_x += width
+
+        return TextSprite(pixels, palette, current_x)
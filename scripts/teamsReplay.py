@@ -0,0 +1,165 @@
+"""
+Local stand-in for Teams: replays recorded message payloads into the webhook receiver at
+a fixed rate, so ingestion can be exercised without a tenant or the network.
+
+    python -m scripts.teamsReplay                                  # synthetic messages, in-process receiver
+    python -m scripts.teamsReplay --payloads recorded.jsonl --rate 2000 --duplicates 0.3
+    python -m scripts.teamsReplay --url http://127.0.0.1:8766/teams  # against a running ticker (--teams 8766)
+
+A recording is one JSON payload per line, as Teams posted it. With --duplicates a share of
+the sends repeat an earlier payload, as Teams does when it retries a delivery. Against the
+in-process receiver the run checks that every unique message was kept exactly once and
+exits with status 1 if not.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import random
+import sys
+import time
+
+import aiohttp
+
+from scripts import teamsWebhook
+from scripts.api import getTeams
+
+SENDERS = ["Service Desk", "NOC", "Alex Morgan", "Sam Patel", "Jordan Lee", "On-call"]
+WORDS = ["ticket", "escalated", "printer", "VPN", "outage", "resolved", "backup", "patching",
+         "tonight", "customer", "firewall", "reboot", "licence", "onboarding", "<b>urgent</b>"]
+RETRY_WINDOW = 64 # Redeliveries repeat one of this many most recent messages
+
+
+def synthetic_payloads(count, seed=3):
+    """Outgoing-webhook activities shaped like the ones Teams posts."""
+    rng = random.Random(seed)
+    return [{
+        "type": "message",
+        "id": f"{1700000000000 + i}",
+        "from": {"id": f"29:{rng.getrandbits(32):08x}", "name": rng.choice(SENDERS)},
+        "text": "<p>" + " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 14))) + "</p>",
+    } for i in range(count)]
+
+
+def load_payloads(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def replay_order(payloads, duplicates, seed=5):
+    """
+    Every payload once, plus redeliveries of recent ones making up about `duplicates` of the
+    sends. Retries come soon after the original, well inside the receiver's seen-id window.
+    """
+    rng = random.Random(seed)
+    order = []
+    for i, payload in enumerate(payloads):
+        order.append(payload)
+        while rng.random() < duplicates:
+            order.append(payloads[rng.randint(max(0, i - RETRY_WINDOW), i)])
+    return order
+
+
+def sign(secret, body):
+    digest = hmac.new(base64.b64decode(secret), body, hashlib.sha256).digest()
+    return f"HMAC {base64.b64encode(digest).decode()}"
+
+
+async def replay(url, payloads, rate, concurrency, secret=None):
+    """
+    Posts each payload at its slot on a fixed-rate schedule (rate 0 = as fast as possible).
+    Returns the per-request round-trip times, the number of failed requests and the seconds taken.
+    """
+    times = []
+    failures = 0
+    queue = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+    start = time.perf_counter()
+    sent = 0
+
+    async def sender(session):
+        nonlocal sent, failures
+        while not queue.empty():
+            payload = queue.get_nowait()
+            slot = sent
+            sent += 1
+            if rate:
+                # Absolute send time, so a slow response does not push every later send back
+                delay = start + slot / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            body = json.dumps(payload).encode("utf-8")
+            headers = {"Content-Type": "application/json"}
+            if secret:
+                headers["Authorization"] = sign(secret, body)
+            begin = time.perf_counter()
+            try:
+                async with session.post(url, data=body, headers=headers) as response:
+                    await response.read()
+                    if response.status != 200:
+                        failures += 1
+            except aiohttp.ClientError:
+                failures += 1
+            times.append(time.perf_counter() - begin)
+
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+        await asyncio.gather(*(sender(session) for _ in range(concurrency)))
+    return times, failures, time.perf_counter() - start
+
+
+async def run(args):
+    payloads = load_payloads(args.payloads) if args.payloads else synthetic_payloads(args.count)
+    order = replay_order(payloads, args.duplicates)
+
+    receiver = None
+    url = args.url
+    if url is None:
+        parser = getTeams.TeamsParser(max_messages=args.buffer)
+        receiver = await teamsWebhook.TeamsWebhook(parser, port=args.port, secret=args.secret).start()
+        url = f"http://127.0.0.1:{args.port}/teams"
+
+    try:
+        times, failures, elapsed = await replay(url, order, args.rate, args.concurrency, args.secret)
+    finally:
+        if receiver is not None:
+            await receiver.stop()
+
+    times.sort()
+    def percentile(p):
+        return times[min(len(times) - 1, int(p / 100 * len(times)))] * 1000 if times else 0.0
+    print(f"Sent {len(order)} requests ({len(payloads)} unique) in {elapsed:.2f} s: "
+          f"{len(order) / elapsed:.0f} req/s | round trip p50/p99/max: "
+          f"{percentile(50):.2f}/{percentile(99):.2f}/{percentile(100):.2f} ms | failed: {failures}")
+
+    if receiver is None:
+        return 1 if failures else 0
+    stats = receiver.stats()
+    print(f"Receiver: {stats['received']} messages, {stats['duplicates']} duplicates dropped, "
+          f"{stats['buffered']} buffered | handler avg/max: {stats['avg_handle_ms']:.3f}/{stats['max_handle_ms']:.3f} ms")
+    unique_ids = {str(payload.get("id")) for payload in payloads}
+    kept = stats["received"] - stats["duplicates"]
+    if failures or kept != len(unique_ids):
+        print(f"\nINGESTION MISMATCH: kept {kept} messages, expected {len(unique_ids)}")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay Teams message payloads into the webhook receiver.")
+    parser.add_argument("--payloads", help="JSONL file of recorded payloads (default: synthetic messages)")
+    parser.add_argument("--count", type=int, default=5000, help="Number of synthetic messages")
+    parser.add_argument("--rate", type=float, default=0, help="Requests per second (0 = as fast as possible)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--duplicates", type=float, default=0.2, help="Share of sends that redeliver an earlier payload")
+    parser.add_argument("--url", help="Post to a running receiver instead of starting one in-process")
+    parser.add_argument("--port", type=int, default=8766, help="Port for the in-process receiver")
+    parser.add_argument("--buffer", type=int, default=getTeams.MAX_MESSAGES, help="In-process ring buffer size")
+    parser.add_argument("--secret", help="Base64 outgoing-webhook token to sign requests with")
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
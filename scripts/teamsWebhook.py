@@ -0,0 +1,104 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+from aiohttp import web
+
+MAX_PAYLOAD_BYTES = 256 * 1024 # Enough for a batch of messages; anything larger is refused
+
+
+class TeamsWebhook:
+    """
+    Webhook receiver for Teams messages, served from the running event loop over HTTP
+    (127.0.0.1) or a Unix socket, so TeamsParser never polls:
+
+        POST /teams     one message, a list of them, or a Graph notification ({"value": [...]})
+        GET  /teams     ingestion counters
+
+    Each message is handed to `parser.ingest`, which dedupes it by id and formats its ticker
+    string there and then; the handler does no other work on the loop. With a `secret`
+    (the base64 security token Teams issues for an outgoing webhook) every request must
+    carry a matching 'Authorization: HMAC <signature>' header.
+    """
+    def __init__(self, parser, port=None, socket_path=None, secret=None, clock=time.perf_counter):
+        self.parser = parser
+        self.port = port
+        self.socket_path = socket_path
+        self._key = base64.b64decode(secret, validate=True) if secret else None
+        self.clock = clock
+        self._runner = None
+
+        self.requests = 0
+        self.rejected = 0
+        self.total_handle = 0.0
+        self.max_handle = 0.0
+
+    def make_app(self):
+        app = web.Application(client_max_size=MAX_PAYLOAD_BYTES)
+        app.add_routes([
+            web.post("/teams", self._post),
+            web.get("/teams", self._get),
+        ])
+        return app
+
+    async def start(self):
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        if self.socket_path:
+            site = web.UnixSite(self._runner, self.socket_path)
+        else:
+            site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+        print(f"Accepting Teams messages on {self.socket_path or f'http://127.0.0.1:{self.port}'}/teams")
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _signed(self, request, body):
+        if self._key is None:
+            return True
+        expected = base64.b64encode(hmac.new(self._key, body, hashlib.sha256).digest()).decode()
+        return hmac.compare_digest(request.headers.get("Authorization", ""), f"HMAC {expected}")
+
+    # --- HTTP handlers ---
+
+    async def _post(self, request):
+        start = self.clock()
+        body = await request.read()
+        if not self._signed(request, body):
+            self.rejected += 1
+            return web.json_response({"error": "bad signature"}, status=401)
+        try:
+            payload = json.loads(body)
+            if isinstance(payload, dict) and isinstance(payload.get("value"), list):
+                # Graph change notification: the messages ride in 'resourceData'
+                payload = [entry.get("resourceData", entry) for entry in payload["value"] if isinstance(entry, dict)]
+            added = self.parser.ingest(payload)
+        except (ValueError, TypeError) as e:
+            # json.JSONDecodeError is a ValueError
+            self.rejected += 1
+            return web.json_response({"error": str(e)}, status=400)
+
+        self.requests += 1
+        handled = self.clock() - start
+        self.total_handle += handled
+        self.max_handle = max(self.max_handle, handled)
+        # An outgoing webhook posts the response back into the channel, so it stays empty
+        return web.json_response({"type": "message", "text": "", "added": added})
+
+    async def _get(self, request):
+        return web.json_response(self.stats())
+
+    def stats(self):
+        return {
+            **self.parser.stats(),
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "avg_handle_ms": self.total_handle / self.requests * 1000 if self.requests else 0.0,
+            "max_handle_ms": self.max_handle * 1000,
+        }
@@ -0,0 +1,154 @@
+import re
+import time
+
+from scripts.api import validity
+
+PLACEHOLDER_PATTERN = re.compile(r'\{(.*?)\}')
+
+
+class Binding:
+    """
+    A `{module:func:arg}` placeholder bound to its callable, with the value cached
+    for as long as the source declares it valid (see scripts/api/validity.py).
+    Sources without a declaration are re-evaluated every time, as before.
+    """
+    __slots__ = ("func", "args", "event", "expires", "epoch", "value")
+
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+        self.event = getattr(func, "valid_until", None)
+        self.expires = 0
+        self.epoch = -1
+        self.value = None
+
+    def refresh(self, now):
+        """Re-evaluates the source if its value has expired; returns True if it changed."""
+        if self.event is not None:
+            current_epoch = validity.epoch(self.event)
+            if current_epoch == self.epoch:
+                return False
+            self.epoch = current_epoch
+        elif now < self.expires:
+            return False
+        else:
+            self.expires = validity.expiry(self.func, now)
+
+        value = self.func(*self.args)
+        if value is not None:
+            value = str(value)
+        if value == self.value:
+            return False
+        self.value = value
+        return True
+
+    def call(self):
+        return self.func(*self.args)
+
+
+class SnapshotBinding:
+    """A placeholder whose source is owned by a DataScheduler; reads never call the source."""
+    __slots__ = ("scheduler", "key", "value")
+
+    def __init__(self, scheduler, key):
+        self.scheduler = scheduler
+        self.key = key
+        self.value = None
+
+    def refresh(self, now):
+        value = self.scheduler.snapshot.get(self.key)
+        if value is self.value:
+            return False
+        self.value = value
+        return True
+
+    def call(self):
+        return self.value
+
+
+class CompiledTemplate:
+    """A layout text split once into literal segments and bound data sources."""
+    __slots__ = ("raw", "parts", "bindings", "_text")
+
+    def __init__(self, raw, parts, bindings):
+        self.raw = raw
+        self.parts = parts
+        self.bindings = bindings
+        self._text = raw if not bindings else None
+
+    @property
+    def is_static(self):
+        return not self.bindings
+
+    def resolve(self, now=None):
+        """Returns the current text, only re-joining when a source's value has changed."""
+        bindings = self.bindings
+        if not bindings:
+            return self._text
+        if now is None:
+            now = time.time()
+
+        changed = False
+        for binding in bindings:
+            if binding.refresh(now):
+                changed = True
+
+        if changed or self._text is None:
+            self._text = "".join(p if p.__class__ is str else (p.value or "") for p in self.parts)
+        return self._text
+
+    def preview(self, binding, value):
+        """The text this template would resolve to if `binding` published `value`."""
+        return "".join(value if p is binding else (p if p.__class__ is str else (p.value or "")) for p in self.parts)
+
+    def run(self):
+        """Calls every bound source for its side effects (e.g. onScrollEnd actions)."""
+        for binding in self.bindings:
+            binding.call()
+
+
+def bind(item, namespace, scheduler=None):
+    """
+    Resolves 'module:func[:arg]' against `namespace`. With a scheduler the source is
+    handed over to it and the binding only reads the published snapshot.
+    """
+    vars = item.split(':')
+    api_module = namespace[vars[0]]
+    func = getattr(api_module, vars[1])
+    if scheduler is not None:
+        scheduler.register(item, func, vars[2:3])
+        return SnapshotBinding(scheduler, item)
+    return Binding(func, tuple(vars[2:3]))
+
+
+def source_template(scheduler, name, func, params=None):
+    """Template for a `dataSource` object: the whole text comes from one scheduled source."""
+    key = scheduler.source_key(name, params)
+    scheduler.register(key, func, kwargs=params)
+    binding = SnapshotBinding(scheduler, key)
+    return CompiledTemplate("{" + key + "}", [binding], [binding])
+
+
+def literal_template(text):
+    """Template that shows `text` exactly as given: placeholders in it are not bound."""
+    return CompiledTemplate(text or "", [text or ""], [])
+
+
+def compile_template(text, namespace, scheduler=None):
+    if not text:
+        return CompiledTemplate(text or "", [text or ""], [])
+
+    parts = []
+    bindings = []
+    pos = 0
+    for match in PLACEHOLDER_PATTERN.finditer(text):
+        if match.start() > pos:
+            parts.append(text[pos:match.start()])
+        binding = bind(match.group(1), namespace, scheduler)
+        parts.append(binding)
+        bindings.append(binding)
+        pos = match.end()
+    if pos < len(text):
+        parts.append(text[pos:])
+
+    return CompiledTemplate(text, parts, bindings)
@@ -1,14 +1,112 @@
 import json
 import os
-from jsonschema import validate, Draft7Validator
-from jsonschema.exceptions import ValidationError
+
+# jsonschema is imported on first validation only: with the layout cache warm
+# (scripts/layoutCache.py) an unchanged layout never needs it.
 
 SCHEMA_DIR = "./schema"
 
+# Schema version key (e.g. "1_0") -> Draft7Validator, built once per process
+_VALIDATORS = {}
+
 class SchemaValidationError(Exception):
     """Custom exception for schema validation errors."""
     pass
 
+def get_validator(version: str):
+    """
+    Returns the compiled validator for a layout version, loading and checking its
+    schema on first use only.
+
+    Raises:
+        SchemaValidationError: If no schema exists for the version.
+    """
+    # Normalise version string to schema filename (e.g. "1.0.0" -> "1_0", major.minor)
+    version_key = "_".join(version.split(".")[0:2])
+    validator = _VALIDATORS.get(version_key)
+    if validator is not None:
+        return validator
+
+    schema_path = os.path.join(SCHEMA_DIR, version_key + ".json")
+    if not os.path.exists(schema_path):
+        raise SchemaValidationError(f"No schema found for version {version} at {schema_path}")
+
+    from jsonschema import Draft7Validator
+
+    # Load schema
+    with open(schema_path, "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    Draft7Validator.check_schema(schema)
+    validator = _VALIDATORS[version_key] = Draft7Validator(schema)
+    return validator
+
+def get_object_validator(version: str):
+    """
+    Returns a validator for a single layout object (the schema's leafObject) of a
+    layout version, built on the cached layout schema.
+    """
+    key = ("leafObject", version)
+    validator = _VALIDATORS.get(key)
+    if validator is None:
+        from jsonschema import Draft7Validator
+        schema = get_validator(version).schema
+        validator = _VALIDATORS[key] = Draft7Validator({"$ref": "#/$defs/leafObject", "$defs": schema["$defs"]})
+    return validator
+
+def _best_error(validator, instance):
+    from jsonschema.exceptions import best_match
+    return best_match(validator.iter_errors(instance))
+
+def schema_path_for(version: str):
+    """Path of the schema file a layout version is validated against."""
+    return os.path.join(SCHEMA_DIR, "_".join(version.split(".")[0:2]) + ".json")
+
+def validate_alert(alert: dict, version: str = "1.0.0"):
+    """
+    Validate a pushed Alert object against the Alert fields of a layout schema version.
+
+    Returns:
+        dict: The validated alert object.
+
+    Raises:
+        SchemaValidationError: If it is not a valid Alert.
+    """
+    if not isinstance(alert, dict) or alert.get("type") != "Alert":
+        raise SchemaValidationError("Validation failed: expected an object with type 'Alert'")
+
+    # Pushed from outside, so the font may only name a file in the fonts directory
+    font = alert.get("font")
+    if isinstance(font, str) and (os.path.basename(font) != font or font in ("", ".", "..")):
+        raise SchemaValidationError(f"Validation failed: font '{font}' must be a file name in the fonts directory")
+
+    error = _best_error(get_object_validator(version), alert)
+    if error is not None:
+        raise SchemaValidationError(f"Validation failed: {error.message}")
+
+    return alert
+
+def validate_layout_data(layout: dict):
+    """
+    Validate an already-parsed layout against its schema version.
+
+    Returns:
+        dict: The validated layout object.
+
+    Raises:
+        SchemaValidationError: If validation fails.
+    """
+    # Extract version (e.g. "1.0.0" -> "1_0")
+    version = layout.get("version")
+    if not version:
+        raise SchemaValidationError("Layout JSON missing 'version' field")
+
+    # Validate
+    error = _best_error(get_validator(version), layout)
+    if error is not None:
+        raise SchemaValidationError(f"Validation failed: {error.message}")
+
+    return layout
+
 def validate_layout(layout_path: str):
     """
     Validate a layout JSON file against its schema version.
@@ -26,27 +124,4 @@ def validate_layout(layout_path: str):
     with open(layout_path, "r", encoding="utf-8") as f:
         layout = json.load(f)
 
-    # Extract version (e.g. "1.0.0" -> "1_0")
-    version = layout.get("version")
-    if not version:
-        raise SchemaValidationError("Layout JSON missing 'version' field")
-
-    # Normalise version string to schema filename
-    version_key = version.split(".")[0:2]  # take major.minor
-    schema_filename = "_".join(version_key) + ".json"
-    schema_path = os.path.join(SCHEMA_DIR, schema_filename)
-
-    if not os.path.exists(schema_path):
-        raise SchemaValidationError(f"No schema found for version {version} at {schema_path}")
-
-    # Load schema
-    with open(schema_path, "r", encoding="utf-8") as f:
-        schema = json.load(f)
-
-    # Validate
-    try:
-        validate(instance=layout, schema=schema, cls=Draft7Validator)
-    except ValidationError as e:
-        raise SchemaValidationError(f"Validation failed: {e.message}")
-
-    return layout
\ No newline at end of file
+    return validate_layout_data(layout)
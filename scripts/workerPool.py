@@ -0,0 +1,43 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# One shared worker process for heavy, GIL-bound source work (feed fetching and parsing).
+# Functions run here must be module-level and return something small and picklable.
+MAX_WORKERS = 1
+
+_POOL = None
+
+
+def _context():
+    # Forked workers don't re-import __main__ (which would build a second matrix/emulator);
+    # platforms without fork fall back to their default start method.
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+def start():
+    """
+    Creates the pool and forks its worker now, without waiting for the worker to come up.
+    Call before starting any threads: a fork taken while another thread holds a lock can
+    deadlock the child.
+    """
+    global _POOL
+    if _POOL is None:
+        _POOL = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=_context())
+        _POOL.submit(os.getpid) # Forks the worker (and only then starts the pool's own thread)
+    return _POOL
+
+
+async def run(func, *args):
+    """Runs func(*args) in the worker process without blocking the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(start(), func, *args)
+
+
+def shutdown():
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL = None
@@ -0,0 +1,92 @@
+"""
+NewsParser against a local stand-in feed server: a first poll gets the feed (200), the
+next is answered 304 Not Modified to the validators it sent, and a failing poll backs off.
+
+    python -m pytest tests/test_getNews.py
+"""
+import asyncio
+import socket
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+from aiohttp import web
+
+from scripts.api import getNews
+
+ETAG = '"feed-v1"'
+ITEM_GAP = 1000 # Seconds between the feed's two items, so its polling interval is ITEM_GAP / 2
+
+
+def rss(now):
+    items = "".join(
+        f"<item><title>Story {i}</title><link>https://news.test/{i}</link><guid>news-test-{i}</guid>"
+        f"<pubDate>{format_datetime(datetime.fromtimestamp(now - 60 - i * ITEM_GAP, timezone.utc))}</pubDate></item>"
+        for i in range(2)
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>Stand-in News</title>{items}</channel></rss>'
+
+
+async def serve(responses):
+    """Starts a feed server on a free local port that answers each GET with the next of `responses`."""
+    requests = []
+
+    async def feed(request):
+        requests.append(dict(request.headers))
+        return responses[len(requests) - 1](request)
+
+    app = web.Application()
+    app.router.add_get("/feed.xml", feed)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    await web.SockSite(runner, sock).start()
+    return runner, f"http://127.0.0.1:{sock.getsockname()[1]}/feed.xml", requests
+
+
+def test_poll_sequence_200_304_then_backoff():
+    async def scenario():
+        body = rss(time.time())
+        runner, url, requests = await serve([
+            lambda request: web.Response(text=body, content_type="application/rss+xml", headers={"ETag": ETAG}),
+            lambda request: web.Response(status=304 if request.headers.get("If-None-Match") == ETAG else 200),
+            lambda request: web.Response(status=500),
+        ])
+        parser = getNews.NewsParser(feeds=[url], use_worker_process=False, snapshot_path=None)
+        try:
+            await parser.refresh_news_feed()
+            state = parser._feed_states[url]
+            timings = parser.get_feed_timings()[url]
+            assert timings["status"] == 200
+            assert (timings["items"], timings["new"]) == (2, 2)
+            assert state.etag == ETAG
+            assert state.failures == 0
+            assert state.interval == ITEM_GAP / 2
+            assert len(parser._upcoming_news_items) == 2
+
+            # Not due yet: nothing is requested
+            await parser.refresh_news_feed()
+            assert len(requests) == 1
+
+            state.next_due = 0
+            await parser.refresh_news_feed()
+            assert requests[1].get("If-None-Match") == ETAG
+            assert parser.get_feed_timings()[url]["status"] == 304
+            assert state.failures == 0
+            assert state.interval == ITEM_GAP / 2 * 1.25 # Unchanged feeds drift to longer intervals
+            assert len(parser._upcoming_news_items) == 2
+
+            state.next_due = 0
+            before = time.monotonic()
+            await parser.refresh_news_feed()
+            assert parser.get_feed_timings()[url]["status"] == 500
+            assert state.failures == 1
+            delay = state.next_due - before
+            assert state.interval * 2 * 0.9 <= delay <= state.interval * 2 * 1.1 + 1
+            assert len(parser._upcoming_news_items) == 2 # A failed poll keeps the stories already had
+        finally:
+            await parser.close()
+            await runner.cleanup()
+
+    asyncio.run(scenario())